@@ -1,7 +1,33 @@
-from src.EON import EON
-import src.Report as Report
-import src.Figure as Figure
-import src.ModulationLevel as ModulationLevel
-import src.Combinations as Combinations
-import src.Demand as Demand
-import src.Simulation as Simulation
\ No newline at end of file
+from importlib import import_module
+
+# Submodules are imported on first use, so a script or worker only pays for what it touches.
+# Plotting and pandas are imported inside the functions needing them.
+modules = {
+    'Report': 'src.Report',
+    'Results': 'src.Results',
+    'Statistics': 'src.Statistics',
+    'Search': 'src.Search',
+    'ModulationLevel': 'src.ModulationLevel',
+    'Combinations': 'src.Combinations',
+    'Demand': 'src.Demand',
+    'Simulation': 'src.Simulation',
+    'Dynamic': 'src.Dynamic',
+    'LoadSweep': 'src.LoadSweep',
+    'Survivability': 'src.Survivability',
+    'Parallel': 'src.Parallel',
+    'Instrumentation': 'src.Instrumentation',
+    'Service': 'src.Service',
+}
+
+# Star imports only bring the simulation core, scripts import the other modules by name
+__all__ = ['EON', 'Report', 'ModulationLevel', 'Combinations', 'Demand', 'Simulation']
+
+def __getattr__(name):
+    if name == 'EON':
+        value = import_module('src.EON').EON
+    elif name in modules:
+        value = import_module(modules[name])
+    else:
+        raise AttributeError('module %r has no attribute %r' % (__name__, name))
+    globals()[name] = value
+    return value
@@ -1,64 +1,52 @@
-from pandas import read_csv, concat
-from glob import glob
+import src.Statistics as Statistics
 import seaborn as sns
 import matplotlib.pyplot as plt
 
-# Loading simulations
-simulate_all = 'results/simulate_all/*.csv'
-simulate_sequentially = 'results/simulate_sequentially/*.csv'
-all_files = glob(simulate_sequentially)
-simulations = []
-for filename in all_files:
-    df = read_csv(filename, index_col=0)
-    simulations.append(df)
-simulations = concat(simulations)
-
-# Beautifying labels
-simulations.columns = [column.replace("_", " ").title() for column in simulations.columns]
-print(simulations.describe())
-
-# Casting columns
-for i in range(len(simulations.columns)):
-  if simulations.dtypes[i] != 'float64' or simulations.dtypes[i] != 'int64':
-    simulations[simulations.columns[i]] = simulations[simulations.columns[i]].astype(float)
-
-# Calculating correlations
-corr = simulations.corr(min_periods=8)
-print(corr)
-
-# Creating palette for plots
-palette = sns.diverging_palette(220, 20, n=200)
-
-# Pairplot
-# sns.pairplot(simulations, palette=palette)
-# plt.show()
-
-# Correlation matrix heatmap
-ax = sns.heatmap(
-  corr,
-  center=0,
-  cmap=palette,
-  square=True,
-  annot=True,
-)
-ax.set_xticklabels(
-  ax.get_xticklabels(),
-  rotation=45,
-  horizontalalignment='right'
-)
-ax.set_title('Correlation matrix heatmap')
-plt.show()
-
-# Blocking Coefficient correlations bar plot
-ax = sns.barplot(
-  x=corr['Blocking Coefficient'].index,
-  y=corr['Blocking Coefficient'].values,
-  palette=palette,
-)
-ax.set_xticklabels(
-  ax.get_xticklabels(),
-  rotation=45,
-  horizontalalignment='right'
-)
-ax.set_title('Correlation by Blocking Coefficient')
-plt.show()
\ No newline at end of file
+if __name__ == '__main__':
+  # Streaming simulations, every file is read in chunks and never fully loaded
+  simulate_all = 'results/simulate_all/'
+  simulate_sequentially = 'results/simulate_sequentially/'
+  statistics = Statistics.summarizeFolder(simulate_sequentially)
+
+  # Beautifying labels
+  statistics.columns = [column.replace("_", " ").title() for column in statistics.columns]
+  print(statistics.describe())
+
+  # Calculating correlations
+  corr = statistics.corr(min_periods=8)
+  print(corr)
+
+  # Creating palette for plots
+  palette = sns.diverging_palette(220, 20, n=200)
+
+  # Pairplot needs every row, so it is left out of the streaming analysis
+
+  # Correlation matrix heatmap
+  ax = sns.heatmap(
+    corr,
+    center=0,
+    cmap=palette,
+    square=True,
+    annot=True,
+  )
+  ax.set_xticklabels(
+    ax.get_xticklabels(),
+    rotation=45,
+    horizontalalignment='right'
+  )
+  ax.set_title('Correlation matrix heatmap')
+  plt.show()
+
+  # Blocking Coefficient correlations bar plot
+  ax = sns.barplot(
+    x=corr['Blocking Coefficient'].index,
+    y=corr['Blocking Coefficient'].values,
+    palette=palette,
+  )
+  ax.set_xticklabels(
+    ax.get_xticklabels(),
+    rotation=45,
+    horizontalalignment='right'
+  )
+  ax.set_title('Correlation by Blocking Coefficient')
+  plt.show()
\ No newline at end of file
@@ -0,0 +1,268 @@
+from EONTools import *
+from argparse import ArgumentParser
+from statistics import median
+from time import perf_counter, strftime
+from hashlib import sha256
+import tracemalloc
+import platform
+import signal
+import json
+import sys
+import gc
+import os
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+topologies = {
+    'rnp': ('input/rnp/rnpBrazil_nodes.csv', 'input/rnp/rnpBrazil_links.csv'),
+    'portugal': ('input/portugal/portugal_nodes.csv', 'input/portugal/portugal_links.csv'),
+    'usa': ('input/usa/usaGde_nodes.csv', 'input/usa/usaGde_links.csv'),
+}
+
+def measure(function, setup=lambda: None, repeat=5, max_time=10, min_sample=0.1, memory=True):
+    # Best and median of a few samples, each one running the operation enough times to last min_sample
+    # (setup is not timed), stopping early for slow operations
+    def sample(number):
+        elapsed = 0
+        for _ in range(number):
+            state = setup()
+            start = perf_counter()
+            function(state)
+            elapsed += perf_counter() - start
+        return elapsed
+    gc.collect()
+    first = sample(1)
+    number = max(1, int(min_sample / first) + 1) if first < min_sample else 1
+    times = [first] if number == 1 else []
+    while len(times) < repeat and sum(times) * number < max_time:
+        gc.collect()
+        times.append(sample(number) / number)
+    timing = {'min': min(times), 'median': median(times), 'runs': len(times) * number}
+    if memory:
+        # Peak of one more run, traced apart since tracing slows everything down
+        state = setup()
+        gc.collect()
+        tracemalloc.start()
+        function(state)
+        timing['peak_memory'] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return timing
+
+def digest(value):
+    return sha256(json.dumps(value, sort_keys=True, default=repr).encode()).hexdigest()
+
+def loadEON(nodes_csv, links_csv, name='EON'):
+    eon = EON(name=name)
+    eon.loadCSV(nodes_csv, links_csv)
+    return eon
+
+class CandidateTimeout(Exception):
+    pass
+
+def raiseTimeout(signum, frame):
+    raise CandidateTimeout()
+
+def measureCandidates(base, modulation_levels, demand_set, n_links, args):
+    # Candidates per second over a time window, at least one candidate unless the timeout hits first;
+    # the first few are simulated to check they did not change
+    count = 0
+    checked = []
+    timed_out = False
+    generator = Combinations.getPossibleEONsWithNewLinks(base, max_length=args.max_length, n_links=n_links, k_edge_connected=args.k_edge_connected or None)
+    alarm = hasattr(signal, 'setitimer')
+    if alarm:
+        signal.signal(signal.SIGALRM, raiseTimeout)
+        signal.setitimer(signal.ITIMER_REAL, args.candidate_timeout)
+    start = perf_counter()
+    try:
+        for possible_eon in generator:
+            count += 1
+            if len(checked) < args.checked_candidates:
+                checked.append(possible_eon)
+            if count >= args.max_candidates or perf_counter() - start >= args.candidate_time:
+                break
+    except CandidateTimeout:
+        timed_out = True
+    finally:
+        elapsed = perf_counter() - start
+        if alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+    generator.close()
+    outputs = []
+    for possible_eon in checked:
+        Simulation.simulateDemandSet(possible_eon, modulation_levels, demand_set)
+        outputs.append([sorted(map(repr, possible_eon.edges(data='length'))), Report.CSVdata(possible_eon, demand_set)])
+    return {'candidates': count, 'time': elapsed, 'candidates_per_sec': count / elapsed, 'timed_out': timed_out}, digest(outputs)
+
+def benchmarkTopology(nodes_csv, links_csv, modulation_levels, args):
+    options = {'repeat': args.repeat, 'max_time': args.max_time, 'memory': not args.no_memory}
+    timings = {}
+    outputs = {}
+
+    timings['load_csv'] = measure(lambda _: loadEON(nodes_csv, links_csv), **options)
+    eon = loadEON(nodes_csv, links_csv)
+
+    def clearRoutes():
+        eon.shortest_path = None
+        eon.shortest_path_length = None
+        eon.path_plans = None
+    timings['initialize_routes'] = measure(lambda _: eon.initializeRoutes(), clearRoutes, **options)
+    outputs['routes'] = digest([eon.shortest_path, eon.shortest_path_length])
+
+    demands = Demand.createRandomDemands(eon, random_state=args.random_state)
+    def resetDemands():
+        eon.resetSpectrum()
+        for demand in demands:
+            demand.reset()
+    def routeDemands(_):
+        for demand in demands:
+            Simulation.route(eon, demand)
+    timings['route'] = measure(routeDemands, resetDemands, **options)
+
+    def prepareDemands():
+        resetDemands()
+        routeDemands(None)
+        for demand in demands:
+            Simulation.allocModulationLevel(eon, demand, modulation_levels)
+    def allocateDemands(_):
+        for demand in demands:
+            Simulation.allocSpectrum(eon, demand)
+            Simulation.executeDemand(eon, demand)
+    timings['alloc_spectrum'] = measure(allocateDemands, prepareDemands, **options)
+    outputs['alloc_spectrum'] = digest([(demand.status, demand.spectrum_begin, demand.frequency_slots) for demand in demands])
+
+    timings['simulate_demands'] = measure(lambda _: Simulation.simulateDemands(eon, modulation_levels, demands), resetDemands, **options)
+    outputs['simulate_demands'] = digest([(demand.status, demand.links_path, demand.spectrum_begin, demand.frequency_slots) for demand in demands])
+
+    timings['csv_data'] = measure(lambda _: Report.CSVdata(eon, demands, id=0), **options)
+    outputs['csv_data'] = digest(Report.CSVdata(eon, demands, id=0))
+
+    # Candidates add new links to the topology, which already meets the connectivity the scripts ask for,
+    # so every topology yields candidates; over the nodes alone USA and Portugal find none in minutes
+    base = loadEON(nodes_csv, links_csv)
+    demand_set = Demand.createRandomDemandSet(base, random_state=args.random_state)
+    candidates = {}
+    for n_links in range(1, 4):
+        candidates['+%d' % n_links], outputs['candidates_+%d' % n_links] = measureCandidates(base, modulation_levels, demand_set, n_links, args)
+    return {'nodes': eon.number_of_nodes(), 'links': eon.number_of_edges(), 'timings': timings, 'candidates': candidates, 'outputs': outputs}
+
+def checkCandidates(results):
+    # A candidate measure that timed out or found nothing has no throughput to compare
+    failures = []
+    for name, result in results['topologies'].items():
+        for key, candidates in result['candidates'].items():
+            if candidates['timed_out'] or candidates['candidates'] == 0:
+                failures.append('%s candidates with %s links: %s after %.1fs' % (name, key, 'timed out' if candidates['timed_out'] else 'none found', candidates['time']))
+    return failures
+
+def compare(results, baseline, tolerance):
+    # Outputs must match exactly, timings may be up to tolerance times slower
+    failures = []
+    for name, result in results['topologies'].items():
+        base = baseline['topologies'].get(name)
+        if base is None:
+            continue
+        for key, value in result['outputs'].items():
+            if key in base['outputs'] and base['outputs'][key] != value:
+                failures.append('%s %s: output differs from the baseline' % (name, key))
+        for key, timing in result['timings'].items():
+            if key in base['timings'] and timing['min'] > tolerance * base['timings'][key]['min']:
+                failures.append('%s %s: %.4fs, %.2fx the baseline %.4fs' % (name, key, timing['min'], timing['min'] / base['timings'][key]['min'], base['timings'][key]['min']))
+        for key, candidates in result['candidates'].items():
+            previous = base['candidates'].get(key)
+            if previous is None or previous['candidates_per_sec'] == 0:
+                continue
+            if candidates['candidates_per_sec'] * tolerance < previous['candidates_per_sec']:
+                failures.append('%s candidates with %s links: %.3f/s against %.3f/s in the baseline' % (name, key, candidates['candidates_per_sec'], previous['candidates_per_sec']))
+    return failures
+
+def printTopology(name, result):
+    print('%s: %d nodes, %d links' % (name, result['nodes'], result['links']))
+    for key, timing in result['timings'].items():
+        memory = ' %8.1f KiB peak' % (timing['peak_memory'] / 1024) if 'peak_memory' in timing else ''
+        print('  %-18s %10.5fs min %10.5fs median %5d runs%s' % (key, timing['min'], timing['median'], timing['runs'], memory))
+    for key, candidates in result['candidates'].items():
+        print('  candidates %-7s %10.3f/s (%d in %.2fs)%s' % (key, candidates['candidates_per_sec'], candidates['candidates'], candidates['time'],
+              ' timed out' if candidates['timed_out'] else ''))
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description='Time the hot paths on the bundled topologies and compare them with a baseline')
+    parser.add_argument('--topologies', nargs='+', default=list(topologies), choices=list(topologies))
+    parser.add_argument('--modulation-levels', default='input/modulation_levels.csv')
+    parser.add_argument('--repeat', type=int, default=5, help='samples per operation, the best one is compared')
+    parser.add_argument('--max-time', type=float, default=10, help='seconds after which an operation is not run again')
+    parser.add_argument('--no-memory', action='store_true', help='skip the traced runs measuring peak memory')
+    parser.add_argument('--candidate-time', type=float, default=5, help='seconds spent generating candidates for each n_links')
+    parser.add_argument('--candidate-timeout', type=float, default=60, help='seconds after which candidate generation is interrupted, reported as a failure')
+    parser.add_argument('--max-candidates', type=int, default=1000)
+    parser.add_argument('--checked-candidates', type=int, default=3, help='first candidates simulated to check their output')
+    parser.add_argument('--max-length', type=float, default=None)
+    parser.add_argument('--k-edge-connected', type=int, default=2, help='as the simulation scripts, 0 for no connectivity check')
+    parser.add_argument('--random-state', type=int, default=0)
+    parser.add_argument('--folder', default='results/benchmark/')
+    parser.add_argument('--baseline', default=None, help='results to compare with, kept outside the output folder')
+    parser.add_argument('--update-baseline', action='store_true', help='record these results as the baseline instead of comparing')
+    parser.add_argument('--tolerance', type=float, default=1.5, help='slowdown against the baseline reported as a regression')
+    args = parser.parse_args()
+
+    modulation_levels = ModulationLevel.loadModulationLevels(args.modulation_levels)
+    results = {
+        'date': strftime('%Y-%m-%d %H:%M:%S'),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'parameters': dict({key: getattr(args, key) for key in ('random_state', 'max_length', 'k_edge_connected', 'checked_candidates')}, candidates='new links over the topology'),
+        'topologies': {},
+    }
+    for name in args.topologies:
+        nodes_csv, links_csv = topologies[name]
+        results['topologies'][name] = benchmarkTopology(nodes_csv, links_csv, modulation_levels, args)
+        printTopology(name, results['topologies'][name])
+    if resource is not None:
+        # Kilobytes on Linux, bytes on macOS
+        results['max_rss'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        print('Peak resident memory: %d' % results['max_rss'])
+
+    os.makedirs(args.folder, exist_ok=True)
+    output = os.path.join(args.folder, 'benchmark_%s.json' % strftime('%Y%m%d-%H%M%S'))
+    with open(output, 'w') as file:
+        json.dump(results, file, indent=2)
+    print('Saved %s' % output)
+
+    # Candidate measures without throughput fail the run, they could never be compared
+    failures = checkCandidates(results)
+    for failure in failures:
+        print('FAILED %s' % failure)
+    if failures:
+        sys.exit(1)
+
+    # Only an explicit baseline is compared or written, a first run must not become the reference by accident
+    baseline_json = args.baseline
+    if baseline_json is None:
+        if args.update_baseline:
+            print('--update-baseline needs --baseline')
+            sys.exit(2)
+        print('No baseline given, nothing compared')
+        sys.exit(0)
+    if args.update_baseline:
+        with open(baseline_json, 'w') as file:
+            json.dump(results, file, indent=2)
+        print('Saved baseline %s' % baseline_json)
+        sys.exit(0)
+    if not os.path.exists(baseline_json):
+        print('Baseline %s does not exist, record it with --update-baseline' % baseline_json)
+        sys.exit(2)
+
+    with open(baseline_json, 'r') as file:
+        baseline = json.load(file)
+    if baseline['parameters'] != results['parameters']:
+        print('Baseline %s was recorded with %s, run again with --update-baseline' % (baseline_json, baseline['parameters']))
+        sys.exit(2)
+    failures = compare(results, baseline, args.tolerance)
+    for failure in failures:
+        print('REGRESSION %s' % failure)
+    if failures:
+        sys.exit(1)
+    print('No regression against %s' % baseline_json)
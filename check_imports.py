@@ -0,0 +1,48 @@
+from argparse import ArgumentParser
+from statistics import median
+import subprocess
+import json
+import sys
+
+# Timing imports in fresh interpreters, the way a spawned worker starts
+probe = '''
+import sys, time, json
+start = time.perf_counter()
+%s
+elapsed = time.perf_counter() - start
+print(json.dumps({'time': elapsed, 'modules': [name for name in %r if name in sys.modules]}))
+'''
+
+checks = {
+    'simulation core': 'import src.EON, src.Simulation, src.Demand, src.Combinations',
+    'EONTools': 'from EONTools import *',
+}
+
+# Heavy libraries no import above may load, they belong inside the functions using them
+forbidden = ['pandas', 'matplotlib', 'seaborn', 'scipy']
+
+def measure(statement, repeat):
+    times = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, '-c', probe % (statement, forbidden)], capture_output=True, text=True, check=True)
+        result = json.loads(output.stdout)
+        times.append(result['time'])
+    return median(times), result['modules']
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description='Fail when importing the simulation core gets slow or loads heavy libraries')
+    parser.add_argument('--budget', type=float, default=1.0, help='seconds allowed per import, median of the repeats')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    failed = False
+    for name, statement in checks.items():
+        elapsed, modules = measure(statement, args.repeat)
+        status = 'ok'
+        if modules:
+            status = 'FAILED: loads %s' % ', '.join(modules)
+        elif elapsed > args.budget:
+            status = 'FAILED: over the %.2fs budget' % args.budget
+        failed = failed or status != 'ok'
+        print('%-16s %.3fs  %s' % (name, elapsed, status))
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,35 @@
+from EONTools import *
+import src.Search as Search
+from argparse import ArgumentParser
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description='Search new links for an EON with a heuristic instead of enumerating them')
+    parser.add_argument('nodes_csv')
+    parser.add_argument('--links-csv', default=None)
+    parser.add_argument('--cache-folder', default=None, help='folder caching the topology and its routes between runs')
+    parser.add_argument('--modulation-levels', default='input/modulation_levels.csv')
+    parser.add_argument('--algorithm', default='simulatedAnnealing', choices=['localSearch', 'simulatedAnnealing', 'geneticAlgorithm'])
+    parser.add_argument('--objective', nargs='+', default=['blocking_coefficient=1'], help='name=weight terms minimized together')
+    parser.add_argument('--budget', type=int, default=1000, help='topologies simulated at most')
+    parser.add_argument('--max-length', type=float, default=None)
+    parser.add_argument('--k-edge-connected', type=int, default=2)
+    parser.add_argument('--random-state', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=1)
+    args = parser.parse_args()
+
+    # Loading EON
+    eon = EON(name='EON without links')
+    eon.loadCSV(args.nodes_csv, args.links_csv, cache_folder=args.cache_folder)
+
+    # Getting modulation levels and demands
+    modulation_levels = ModulationLevel.loadModulationLevels(args.modulation_levels)
+    demands = Demand.createRandomDemands(eon, random_state=args.random_state)
+
+    objectives = {name: float(weight) for name, weight in (term.split('=') for term in args.objective)}
+    with Search.TopologySearch(eon, modulation_levels, demands, max_length=args.max_length, k_edge_connected=args.k_edge_connected,
+                               objectives=objectives, budget=args.budget, workers=args.workers,
+                               random_state=args.random_state, verbose=True) as search:
+        links, fitness = getattr(search, args.algorithm)()
+    print('Best fitness %g after %d simulations' % (fitness, search.evaluations))
+    for source, target, length in links or []:
+        print('%s - %s (%.1f km)' % (source, target, length))
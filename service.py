@@ -0,0 +1,46 @@
+import src.Service as Service
+from argparse import ArgumentParser
+import asyncio
+import json
+import sys
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description='Local service evaluating topologies on a warm process pool, with a result cache')
+    parser.add_argument('--socket', default='/tmp/eontools.sock', help='Unix socket of the service')
+    parser.add_argument('--port', type=int, default=None, help='localhost port instead of the Unix socket')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    serve = subparsers.add_parser('serve', help='run the service')
+    serve.add_argument('--cache-folder', default='results/service/', help='folder of the cached rows')
+    serve.add_argument('--topology-cache', default=None, help='folder caching topologies and their routes')
+    serve.add_argument('--workers', type=int, default=None)
+    serve.add_argument('--batch-size', type=int, default=16, help='jobs sent together to a worker')
+    submit = subparsers.add_parser('submit', help='submit the jobs of a JSON file and print the rows as they arrive')
+    submit.add_argument('jobs_json', help='list of jobs, each one with nodes_csv and optionally links_csv, links, random_state, '
+                                          'modulation_levels, k_paths, frequency_slots, spectrum_policy, fragmentation, survivability and id')
+    submit.add_argument('--id', default=None)
+    cancel = subparsers.add_parser('cancel', help='cancel a submission')
+    cancel.add_argument('id')
+    subparsers.add_parser('status', help='print the state of the service')
+    subparsers.add_parser('shutdown', help='stop the service')
+    args = parser.parse_args()
+    address = {'path': args.socket, 'port': args.port}
+
+    if args.command == 'serve':
+        service = Service.JobService(cache_folder=args.cache_folder, topology_cache=args.topology_cache,
+                                     workers=args.workers, batch_size=args.batch_size)
+        print('Serving on %s' % ('localhost:%d' % args.port if args.port is not None else args.socket))
+        try:
+            asyncio.run(service.serve(**address))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            service.close()
+        sys.exit(0)
+
+    if args.command == 'submit':
+        with open(args.jobs_json, 'r') as file:
+            message = {'type': 'submit', 'id': args.id, 'jobs': json.load(file)}
+    else:
+        message = {'type': args.command, 'id': getattr(args, 'id', None)}
+    for answer in Service.request(message, **address):
+        print(json.dumps(answer, default=Service.toJSON))
@@ -0,0 +1,35 @@
+from EONTools import *
+import src.Dynamic as Dynamic
+from argparse import ArgumentParser
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description='Blocking probability of an EON under dynamic traffic')
+    parser.add_argument('nodes_csv')
+    parser.add_argument('links_csv')
+    parser.add_argument('--cache-folder', default=None, help='folder caching the topology and its routes between runs')
+    parser.add_argument('--modulation-levels', default='input/modulation_levels.csv')
+    parser.add_argument('--load', type=float, required=True, help='offered load in Erlangs')
+    parser.add_argument('--holding-time', type=float, default=1)
+    parser.add_argument('--interval', type=int, default=10000, help='arrivals per reported interval')
+    parser.add_argument('--warmup', type=int, default=1, help='intervals left out of the estimate')
+    parser.add_argument('--max-arrivals', type=int, default=10**6)
+    parser.add_argument('--confidence', type=float, default=0.95)
+    parser.add_argument('--precision', type=float, default=0.05, help='relative half width to stop at')
+    parser.add_argument('--spectrum-policy', default='first_fit', choices=['first_fit', 'best_fit', 'exact_fit', 'last_fit', 'random_fit'])
+    parser.add_argument('--random-state', type=int, default=0)
+    args = parser.parse_args()
+
+    eon = EON()
+    eon.loadCSV(args.nodes_csv, args.links_csv, cache_folder=args.cache_folder)
+    eon.setSpectrumPolicy(args.spectrum_policy, random_state=args.random_state)
+    modulation_levels = ModulationLevel.loadModulationLevels(args.modulation_levels)
+
+    def report(statistics):
+        print('%(arrivals)d arrivals, %(active)d active: interval blocking %(interval_blocking).5f, '
+              'blocking probability %(blocking_probability).5f +- %(half_width).5f' % statistics)
+
+    statistics = Dynamic.simulateDynamic(eon, modulation_levels, args.load, callback=report, holding_time=args.holding_time,
+                                         interval=args.interval, warmup=args.warmup, max_arrivals=args.max_arrivals,
+                                         confidence=args.confidence, precision=args.precision, random_state=args.random_state)
+    print('Blocking probability %.5f +- %.5f, bandwidth blocking %.5f%s' % (statistics['blocking_probability'], statistics['half_width'],
+          statistics['bandwidth_blocking_probability'], '' if statistics['converged'] else ' (not converged)'))
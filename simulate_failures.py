@@ -0,0 +1,32 @@
+from EONTools import *
+import src.Parallel as Parallel
+import src.Survivability as Survivability
+from argparse import ArgumentParser
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description='Blocking of an EON under every single link failure')
+    parser.add_argument('nodes_csv')
+    parser.add_argument('links_csv')
+    parser.add_argument('--cache-folder', default=None, help='folder caching the topology and its routes between runs')
+    parser.add_argument('--modulation-levels', default='input/modulation_levels.csv')
+    parser.add_argument('--spectrum-policy', default='first_fit', choices=['first_fit', 'best_fit', 'exact_fit', 'last_fit', 'random_fit'])
+    parser.add_argument('--random-state', type=int, default=0)
+    parser.add_argument('--no-recompute-routes', action='store_true', help='block pairs whose k paths all cross the failed link')
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    eon = EON()
+    eon.loadCSV(args.nodes_csv, args.links_csv, cache_folder=args.cache_folder)
+    eon.setSpectrumPolicy(args.spectrum_policy, random_state=args.random_state)
+    modulation_levels = ModulationLevel.loadModulationLevels(args.modulation_levels)
+
+    # Simulating the demands once, failures only reroute the connections they tear down
+    demand_set = Demand.createRandomDemandSet(eon, random_state=args.random_state)
+    Simulation.simulateDemandSet(eon, modulation_levels, demand_set)
+    print('Without failures: blocking %.5f' % Report.fromDemands(demand_set)['blocking_coefficient'])
+
+    failures = Parallel.simulateFailures(eon, demand_set, workers=args.workers, recompute_routes=not args.no_recompute_routes)
+    for (source, target), failure in sorted(failures.items(), key=lambda item: -item[1]['blocking_coefficient']):
+        print('%s-%s: %d torn down, %d restored, blocking %.5f' % (source, target, failure['affected'], failure['restored'], failure['blocking_coefficient']))
+    summary = Survivability.summarize(failures)
+    print('Mean blocking %.5f, worst blocking %.5f, restorability %.5f' % (summary['mean_failure_blocking'], summary['worst_failure_blocking'], summary['restorability']))
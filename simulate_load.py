@@ -0,0 +1,43 @@
+from EONTools import *
+import src.LoadSweep as LoadSweep
+from argparse import ArgumentParser
+import csv
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description='Blocking of an EON as its traffic grows, over one incremental simulation')
+    parser.add_argument('nodes_csv')
+    parser.add_argument('links_csv')
+    parser.add_argument('--cache-folder', default=None, help='folder caching the topology and its routes between runs')
+    parser.add_argument('--modulation-levels', default='input/modulation_levels.csv')
+    parser.add_argument('--spectrum-policy', default='first_fit', choices=['first_fit', 'best_fit', 'exact_fit', 'last_fit', 'random_fit'])
+    parser.add_argument('--random-state', type=int, default=0)
+    parser.add_argument('--multipliers', type=float, nargs='+', default=[0.25, 0.5, 0.75, 1, 1.5, 2, 3, 4], help='loads as multiples of the demand set')
+    parser.add_argument('--demands', type=int, nargs='+', default=None, help='numbers of demands instead of multipliers')
+    parser.add_argument('--threshold', type=float, default=None, help='also search the load where blocking reaches it')
+    parser.add_argument('--metric', default='blocking_coefficient', choices=['blocking_coefficient', 'bandwidth_blocking'])
+    parser.add_argument('--max-multiplier', type=float, default=64)
+    parser.add_argument('--csv', default=None, help='file the points are written to')
+    args = parser.parse_args()
+
+    eon = EON()
+    eon.loadCSV(args.nodes_csv, args.links_csv, cache_folder=args.cache_folder)
+    eon.setSpectrumPolicy(args.spectrum_policy, random_state=args.random_state)
+    modulation_levels = ModulationLevel.loadModulationLevels(args.modulation_levels)
+    demand_set = Demand.createRandomDemandSet(eon, random_state=args.random_state)
+
+    points = LoadSweep.sweepLoad(eon, modulation_levels, demand_set, multipliers=args.multipliers, n_demands=args.demands)
+    for point in points:
+        print('Load %(load).3f (%(demands)d demands): blocking %(blocking_coefficient).5f, bandwidth blocking %(bandwidth_blocking).5f' % point)
+    if args.csv is not None:
+        with open(args.csv, 'w', newline='') as file:
+            writer = csv.DictWriter(file, fieldnames=list(points[0]))
+            writer.writeheader()
+            writer.writerows(points)
+        file.close()
+
+    if args.threshold is not None:
+        point = LoadSweep.findLoadThreshold(eon, modulation_levels, demand_set, args.threshold, metric=args.metric, max_multiplier=args.max_multiplier)
+        if point is None:
+            print('%s stays under %g up to load %g' % (args.metric, args.threshold, args.max_multiplier))
+        else:
+            print('%s reaches %g at load %.3f (%d demands)' % (args.metric, args.threshold, point['load'], point['demands']))
@@ -0,0 +1,50 @@
+from EONTools import *
+import src.Instrumentation as Instrumentation
+import src.Parallel as Parallel
+from argparse import ArgumentParser
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description='Simulate every EON with new links on a process pool')
+    parser.add_argument('nodes_csv')
+    parser.add_argument('--links-csv', default=None)
+    parser.add_argument('--cache-folder', default=None, help='folder caching the topology and its routes between runs')
+    parser.add_argument('--modulation-levels', default='input/modulation_levels.csv')
+    parser.add_argument('--n-links', type=int, nargs='+', required=True, help='numbers of new links to simulate')
+    parser.add_argument('--max-length', type=float, default=None)
+    parser.add_argument('--k-edge-connected', type=int, default=2)
+    parser.add_argument('--random-state', type=int, default=0)
+    parser.add_argument('--start', type=int, default=0, help='first candidate id of this shard')
+    parser.add_argument('--stop', type=int, default=None, help='candidate id where this shard stops')
+    parser.add_argument('--csv-name', required=True)
+    parser.add_argument('--folder', default='results/')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--chunk-size', type=int, default=None, help='candidate ids per task')
+    parser.add_argument('--batch-size', type=int, default=32, help='candidates simulated together by a worker')
+    parser.add_argument('--formats', nargs='+', default=['csv'], choices=['csv', 'npy'], help='outputs written by the results writer')
+    parser.add_argument('--buffer-size', type=int, default=4096, help='rows buffered before each flush')
+    parser.add_argument('--instrument', action='store_true', help='time each stage and count candidates and blocked demands')
+    parser.add_argument('--progress-interval', type=float, default=None, help='seconds between progress lines')
+    parser.add_argument('--survivability', action='store_true', help='add blocking under single link failures to every row')
+    args = parser.parse_args()
+
+    # Loading EON
+    eon = EON(name='EON without links')
+    eon.loadCSV(args.nodes_csv, args.links_csv, cache_folder=args.cache_folder)
+
+    # Getting modulation levels and demands
+    modulation_levels = ModulationLevel.loadModulationLevels(args.modulation_levels)
+    demands = Demand.createRandomDemands(eon, random_state=args.random_state)
+
+    counters = Parallel.simulate(eon, modulation_levels, demands, args.n_links, args.csv_name, folder=args.folder,
+                                 max_length=args.max_length, k_edge_connected=args.k_edge_connected,
+                                 start=args.start, stop=args.stop,
+                                 workers=args.workers, chunk_size=args.chunk_size, batch_size=args.batch_size,
+                                 formats=args.formats, buffer_size=args.buffer_size,
+                                 instrument=args.instrument, progress_interval=args.progress_interval,
+                                 survivability=args.survivability)
+    print('Candidates by filter: %s'%dict(counters))
+    if args.instrument:
+        # Summary next to the results, with the filter counters of the workers
+        summary_json = args.folder + args.csv_name + '.summary.json'
+        Instrumentation.writeSummary(summary_json, {'candidate_filter': dict(counters)})
+        print('Summary saved in %s' % summary_json)
@@ -1,9 +1,13 @@
 import networkx as nx
-from itertools import combinations, permutations
+from src.EON import EONOverlay
+from itertools import combinations
 from haversine import haversine
-from copy import deepcopy
+from math import comb, inf
+from collections import Counter
+from heapq import heappush, heappop
+import numpy as np
 
-def getPossibleNewLinks(eon, max_length=None, n_links=1):
+def getCandidateLinks(eon, max_length=None):
     coord = nx.get_node_attributes(eon, 'coord')
     H = nx.complement(eon)
 
@@ -12,37 +16,459 @@ def getPossibleNewLinks(eon, max_length=None, n_links=1):
         length = haversine(coord[link[0]], coord[link[1]])
         if max_length is None or length <= max_length:
             links.append((link[0], link[1], length))
-    
-    return combinations(links, n_links)
+    return links
 
-def getPossibleCycleLinks(eon, max_length=None):
+def getPossibleNewLinks(eon, max_length=None, n_links=1, start=0, stop=None, step=1):
+    links = getCandidateLinks(eon, max_length)
+    if start == 0 and stop is None and step == 1:
+        return combinations(links, n_links)
+    return iterateCombinations(links, n_links, start=start, stop=stop, step=step)
+
+def countPossibleNewLinks(eon, max_length=None, n_links=1):
+    return comb(len(getCandidateLinks(eon, max_length)), n_links)
+
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+# Indexing combinations in the same lexicographic order of combinations #
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+def unrankPositions(n_items, n_choose, index):
+    positions = []
+    item = 0
+    for remaining in range(n_choose, 0, -1):
+        count = comb(n_items - item - 1, remaining - 1)
+        while index >= count:
+            index -= count
+            item += 1
+            count = comb(n_items - item - 1, remaining - 1)
+        positions.append(item)
+        item += 1
+    return positions
+
+def rankPositions(n_items, positions):
+    index = 0
+    item = 0
+    n_choose = len(positions)
+    for i, position in enumerate(positions):
+        remaining = n_choose - i
+        while item < position:
+            index += comb(n_items - item - 1, remaining - 1)
+            item += 1
+        item += 1
+    return index
+
+def unrankCombination(items, n_choose, index):
+    if index < 0 or index >= comb(len(items), n_choose):
+        raise IndexError('combination index out of range')
+    return tuple(items[i] for i in unrankPositions(len(items), n_choose, index))
+
+def rankCombination(items, combination):
+    position = {item: i for i, item in enumerate(items)}
+    return rankPositions(len(items), [position[item] for item in combination])
+
+def nextPositions(n_items, positions):
+    # Advancing to the next combination, False when there is none
+    n_choose = len(positions)
+    i = n_choose - 1
+    while i >= 0 and positions[i] == n_items - n_choose + i:
+        i -= 1
+    if i < 0:
+        return False
+    positions[i] += 1
+    for j in range(i + 1, n_choose):
+        positions[j] = positions[j - 1] + 1
+    return True
+
+def iterateCombinations(items, n_choose, start=0, stop=None, step=1):
+    total = comb(len(items), n_choose)
+    stop = total if stop is None else min(stop, total)
+    index = start
+    if index >= stop:
+        return
+    positions = unrankPositions(len(items), n_choose, index)
+    while True:
+        yield tuple(items[i] for i in positions)
+        index += step
+        if index >= stop:
+            return
+        if step == 1:
+            nextPositions(len(items), positions)
+        else:
+            positions = unrankPositions(len(items), n_choose, index)
+
+def getNodeDistances(eon, nodes=None):
+    # Haversine length between every pair of nodes, computed once
+    if nodes is None:
+        nodes = list(eon.nodes)
     coord = nx.get_node_attributes(eon, 'coord')
+    distances = np.zeros((len(nodes), len(nodes)))
+    for i, j in combinations(range(len(nodes)), 2):
+        distances[i, j] = distances[j, i] = haversine(coord[nodes[i]], coord[nodes[j]])
+    return distances
+
+def getSpanningTree(weights, members):
+    # Prim's minimum spanning tree over some nodes of a dense matrix given as lists,
+    # plain Python being faster than NumPy on a few dozen nodes, infinite when they are not connected
+    root = members[0]
+    keys = {node: weights[root][node] for node in members[1:]}
+    parents = dict.fromkeys(keys, root)
+    degrees = dict.fromkeys(members, 0)
+    total = 0
+    while keys:
+        node = min(keys, key=keys.get)
+        total += keys.pop(node)
+        if total == inf:
+            break
+        degrees[node] += 1
+        degrees[parents[node]] += 1
+        row = weights[node]
+        for other in keys:
+            if row[other] < keys[other]:
+                keys[other] = row[other]
+                parents[other] = node
+    return total, degrees
+
+def getRingPotentials(weights, iterations=300):
+    # Held and Karp's 1-tree bound: node potentials added to the hops leave ring lengths unchanged
+    # up to a constant, subgradient steps push the tree towards degree two and tighten the bound
+    n = len(weights)
+    potentials = np.zeros(n)
+    best_potentials, best_bound = potentials, -inf
+    scale = 2
+    stalled = 0
+    for _ in range(iterations):
+        modified = weights + potentials[:, None] + potentials[None, :]
+        tree, degrees = getSpanningTree(modified.tolist(), list(range(1, n)))
+        closest = np.argpartition(modified[0, 1:], 1)[:2] + 1
+        bound = tree + modified[0, closest].sum() - 2 * potentials.sum()
+        if not np.isfinite(bound):
+            break
+        if bound > best_bound:
+            best_potentials, best_bound = potentials, bound
+            stalled = 0
+        else:
+            stalled += 1
+            if stalled >= 20:
+                scale /= 2
+                stalled = 0
+        gradient = np.array([2] + [degrees[node] for node in range(1, n)]) - 2
+        gradient[closest] += 1
+        if not gradient.any():
+            break
+        potentials = potentials + scale * 0.01 * abs(bound) / (gradient**2).sum() * gradient
+    return best_potentials
+
+def getPossibleCycleLinks(eon, max_length=None, max_total_length=None, k_shortest=None):
+    # Rings through every node, as links from the first node, each ring once and not also reversed
     nodes = list(eon.nodes)
-    for cycle in permutations(nodes[1:], len(nodes[1:])):
-        ignore_cycle = False
-        cycle = nodes[0:1] + list(cycle) + nodes[0:1]
-        links = []
-        for i in range(len(cycle)-1):
-            link = (cycle[i], cycle[i+1])
-            length = haversine(coord[link[0]], coord[link[1]])
-            if max_length is None or length <= max_length:
-                links.append((link[0], link[1], length))
-            else:
-                ignore_cycle = True
+    n = len(nodes)
+    if n < 3:
+        return
+    distances = getNodeDistances(eon, nodes)
+    feasible = np.ones((n, n), dtype=bool) if max_length is None else distances <= max_length
+    np.fill_diagonal(feasible, False)
+    weights = np.where(feasible, distances, np.inf)
+    order = distances
+    if max_total_length is not None or k_shortest is not None:
+        potentials = getRingPotentials(weights)
+        order = weights + potentials[:, None] + potentials[None, :]
+        modified = order.tolist()
+        potentials = potentials.tolist()
+    # Nearest first, so short rings come early and tighten the bound of the k shortest
+    neighbors = [sorted(np.flatnonzero(feasible[i]).tolist(), key=order[i].__getitem__) for i in range(n)]
+    if min(len(hops) for hops in neighbors) < 2:
+        return
+    masks = [sum(1 << j for j in hops) for hops in neighbors]
+
+    # Every node is entered and left once, so half its two shortest hops is a lower bound of what it adds
+    shortest = [np.sort(distances[i][feasible[i]])[:2] for i in range(n)]
+    half = [(a + b) / 2 for a, b in shortest]
+    first_half = [a / 2 for a, _ in shortest]
+    # Hops left to each node that do not go through the inside of the path
+    available = [len(hops) for hops in neighbors]
+
+    def getNextNodes(node, unvisited, second):
+        # The last node closes the ring to the first one and comes after the second, not to yield it reversed
+        last_nodes = unvisited & masks[0] & -(1 << (second + 1))
+        if not last_nodes:
+            return []
+        # Unvisited nodes with two hops left must use both, at most one can use the end of the path
+        # and one the first node, the end of the path must go to the one using it
+        forced = None
+        closing = 0
+        remaining = unvisited
+        while remaining:
+            bit = remaining & -remaining
+            remaining ^= bit
+            w = bit.bit_length() - 1
+            if available[w] < 2:
+                return []
+            if available[w] == 2:
+                if masks[w] & (1 << node):
+                    if forced is not None:
+                        return []
+                    forced = w
+                if masks[w] & 1:
+                    closing += 1
+                    if closing > 1 or w <= second or (forced == w and unvisited != bit):
+                        return []
+        # Hops between the unvisited nodes and both ends must still join them all
+        allowed = unvisited | 1
+        reached = frontier = 1 << node
+        while frontier:
+            bit = frontier & -frontier
+            frontier ^= bit
+            new = masks[bit.bit_length() - 1] & allowed & ~reached
+            reached |= new
+            frontier |= new & ~1
+        if unvisited & ~reached or not reached & 1:
+            return []
+        return [forced] if forced is not None else neighbors[node]
+
+    limit = np.inf if max_total_length is None else max_total_length
+    best = []
+    path = [0]
+    lengths = [0]
+    unvisited = (1 << n) - 2
+    unvisited_half = sum(half) - half[0]
+    stack = [iter(neighbors[0])]
+    while stack:
+        current = path[-1]
+        for node in stack[-1]:
+            if not unvisited & (1 << node):
+                continue
+            step = lengths[-1] + distances[current, node]
+            if len(path) == n - 1:
+                # Closing the ring, the reversed ring has its second and last nodes swapped
+                total = step + distances[node, 0]
+                if not feasible[node, 0] or node < path[1] or total > limit:
+                    continue
+                ring = path + [node, 0]
+                if k_shortest is None:
+                    yield [(nodes[ring[i]], nodes[ring[i+1]], distances[ring[i], ring[i+1]]) for i in range(n)]
+                else:
+                    heappush(best, (-total, ring))
+                    if len(best) > k_shortest:
+                        heappop(best)
+                    if len(best) == k_shortest:
+                        limit = min(limit, -best[0][0])
+                continue
+            # Bounds add up in another order than ring lengths, so a ring right at the limit must not be cut by rounding
+            cut = limit + 1e-9 * abs(limit)
+            if step + unvisited_half - half[node] + first_half[node] + first_half[0] > cut:
+                continue
+            left = unvisited & ~(1 << node)
+            if limit < np.inf:
+                # What is left is a path from the new node through the unvisited ones to the first,
+                # never shorter than their spanning tree and a hop from each end, all with potentials
+                members = [i for i in range(n) if left & (1 << i)]
+                tree, _ = getSpanningTree(modified, members)
+                bound = tree + min(modified[node][i] for i in members) + min(modified[0][i] for i in members)
+                bound -= 2 * sum(potentials[i] for i in members) + potentials[node] + potentials[0]
+                if step + bound > cut:
+                    continue
+            # The current node goes inside the path, its unvisited neighbors need two hops left
+            if len(path) > 1:
+                for neighbor in neighbors[current]:
+                    available[neighbor] -= 1
+            next_nodes = getNextNodes(node, left, path[1] if len(path) > 1 else node)
+            if not next_nodes:
+                if len(path) > 1:
+                    for neighbor in neighbors[current]:
+                        available[neighbor] += 1
+                continue
+            path.append(node)
+            lengths.append(step)
+            unvisited = left
+            unvisited_half -= half[node]
+            stack.append(iter(next_nodes))
+            break
+        else:
+            stack.pop()
+            node = path.pop()
+            if not path:
                 break
-        if not ignore_cycle:
-            yield links
+            unvisited |= 1 << node
+            unvisited_half += half[node]
+            lengths.pop()
+            if len(path) > 1:
+                for neighbor in neighbors[path[-1]]:
+                    available[neighbor] += 1
+
+    for total, ring in sorted(best, reverse=True):
+        yield [(nodes[ring[i]], nodes[ring[i+1]], distances[ring[i], ring[i+1]]) for i in range(n)]
+
+def getPossibleEONsWithNewLinks(eon, max_length=None, n_links=1, k_edge_connected=None, possible_links=None, counters=None):
+    # Candidates update the base routes instead of building their own
+    if eon.shortest_path is None:
+        eon.initializeRoutes()
+    if k_edge_connected is None:
+        if possible_links is None:
+            possible_links = getPossibleNewLinks(eon, max_length, n_links)
+    else:
+        # Rejecting candidates on a lightweight adjacency before building them
+        candidate_filter = CandidateFilter(eon, getCandidateLinks(eon, max_length), k_edge_connected, counters)
+        if possible_links is None:
+            possible_links = (links for _, links in candidate_filter.iterate(n_links))
+        else:
+            possible_links = filter(candidate_filter.accepts, possible_links)
+        k_edge_connected = getExactCheck(k_edge_connected)
 
-def getPossibleEONsWithNewLinks(eon, max_length=None, n_links=1, k_edge_connected=None, possible_links=None):
-    if possible_links is None:
-        possible_links = getPossibleNewLinks(eon, max_length, n_links)
-    
     for links in possible_links:
-        H = deepcopy(eon)
-        for link in links:
-            H.addLink(link[0], link[1], link[2])
-        if k_edge_connected is None or nx.is_k_edge_connected(H, k_edge_connected):
-            H.name = 'EON with %d links'%len(H.edges())
-            H.resetSpectrum()
+        H = createPossibleEON(eon, links, k_edge_connected=k_edge_connected, counters=counters)
+        if H is not None:
+            yield H
+
+def createPossibleEON(eon, links, k_edge_connected=None, counters=None):
+    H = EONOverlay(eon)
+    for link in links:
+        H.addLink(link[0], link[1], link[2], update_routes=False)
+    if k_edge_connected is None or isKEdgeConnected(H, k_edge_connected):
+        H.name = 'EON with %d links'%len(H.edges())
+        H.resetSpectrum()
+        # Routes shared with the base are updated once for all the new links
+        if H.shortest_path is None:
             H.initializeRoutes()
-            yield H
\ No newline at end of file
+        else:
+            H.updateRoutes([(link[0], link[1]) for link in links if link[0] != link[1]])
+        return H
+    if counters is not None:
+        counters['k_edge_connectivity'] += 1
+    return None
+
+def isKEdgeConnected(eon, k_edge_connected):
+    return nx.is_k_edge_connected(eon, k_edge_connected)
+
+def getExactCheck(k_edge_connected):
+    # CandidateFilter is already exact up to 2-edge-connectivity
+    if k_edge_connected is not None and k_edge_connected > 2:
+        return k_edge_connected
+    return None
+
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+# Filtering candidates by minimum degree, connectivity and bridges          #
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+class CandidateFilter:
+    def __init__(self, eon, links, k_edge_connected=None, counters=None):
+        self.links = links
+        self.k = k_edge_connected or 0
+        self.counters = Counter() if counters is None else counters
+        # Indexing nodes and the base topology
+        nodes = list(eon.nodes())
+        self.node_index = {node: i for i, node in enumerate(nodes)}
+        self.n_nodes = len(nodes)
+        self.adjacency = [[] for _ in nodes]
+        for source, target in eon.edges():
+            self.adjacency[self.node_index[source]].append(self.node_index[target])
+            self.adjacency[self.node_index[target]].append(self.node_index[source])
+        self.degree = [len(neighbors) for neighbors in self.adjacency]
+        self.endpoints = [(self.node_index[link[0]], self.node_index[link[1]]) for link in links]
+        # Counting candidate links incident to each node from each position on
+        self.suffix = [[0]*(len(links)+1) for _ in nodes]
+        for position in range(len(links)-1, -1, -1):
+            for node in range(self.n_nodes):
+                self.suffix[node][position] = self.suffix[node][position+1]
+            for node in self.endpoints[position]:
+                self.suffix[node][position] += 1
+
+    def reachable(self, degree, first, remaining):
+        # Whether picking remaining links from position first on can reach degree k
+        need = 0
+        for node in range(self.n_nodes):
+            deficit = self.k - degree[node]
+            if deficit > 0:
+                if deficit > remaining or self.suffix[node][first] < deficit:
+                    return False
+                need += deficit
+        return need <= 2*remaining
+
+    def iterate(self, n_links, start=0, stop=None):
+        # Yielding (index, links) of accepted candidates, index as in getPossibleNewLinks
+        total = comb(len(self.links), n_links)
+        stop = total if stop is None else min(stop, total)
+        if start < stop:
+            yield from self.search(list(self.degree), [], 0, 0, total, n_links, start, stop)
+
+    def search(self, degree, positions, first, rank, end, remaining, start, stop):
+        if remaining == 0:
+            reason = self.reject(degree, [self.endpoints[i] for i in positions])
+            if reason is None:
+                self.counters['accepted'] += 1
+                yield rank, tuple(self.links[i] for i in positions)
+            else:
+                self.counters[reason] += 1
+            return
+        n_items = len(self.links)
+        for item in range(first, n_items - remaining + 1):
+            if rank >= stop:
+                return
+            if not self.reachable(degree, item, remaining):
+                # Later positions only have fewer links left, so the whole subtree is pruned
+                self.counters['degree'] += min(end, stop) - max(rank, start)
+                return
+            size = comb(n_items - item - 1, remaining - 1)
+            if rank + size > start:
+                source, target = self.endpoints[item]
+                degree[source] += 1
+                degree[target] += 1
+                positions.append(item)
+                yield from self.search(degree, positions, item + 1, rank, rank + size, remaining - 1, start, stop)
+                positions.pop()
+                degree[source] -= 1
+                degree[target] -= 1
+            rank += size
+
+    def accepts(self, links):
+        degree = list(self.degree)
+        endpoints = []
+        for link in links:
+            source, target = self.node_index[link[0]], self.node_index[link[1]]
+            if target not in self.adjacency[source] and (source, target) not in endpoints and (target, source) not in endpoints:
+                degree[source] += 1
+                degree[target] += 1
+                endpoints.append((source, target))
+        reason = self.reject(degree, endpoints)
+        if reason is None:
+            self.counters['accepted'] += 1
+            return True
+        self.counters[reason] += 1
+        return False
+
+    def reject(self, degree, endpoints):
+        if self.k == 0:
+            return None
+        if any(d < self.k for d in degree):
+            return 'degree'
+        adjacency = [list(neighbors) for neighbors in self.adjacency]
+        for source, target in endpoints:
+            adjacency[source].append(target)
+            adjacency[target].append(source)
+        # Depth-first search with low-links finds disconnections and bridges at once
+        order = [-1]*self.n_nodes
+        low = [0]*self.n_nodes
+        order[0] = low[0] = 0
+        visited = 1
+        has_bridge = False
+        stack = [(0, -1, iter(adjacency[0]))]
+        while stack:
+            node, parent, neighbors = stack[-1]
+            for neighbor in neighbors:
+                if order[neighbor] == -1:
+                    order[neighbor] = low[neighbor] = visited
+                    visited += 1
+                    stack.append((neighbor, node, iter(adjacency[neighbor])))
+                    break
+                elif neighbor != parent:
+                    low[node] = min(low[node], order[neighbor])
+            else:
+                stack.pop()
+                if stack:
+                    parent = stack[-1][0]
+                    low[parent] = min(low[parent], low[node])
+                    if low[node] > order[parent]:
+                        has_bridge = True
+        if visited < self.n_nodes:
+            return 'connectivity'
+        if has_bridge and self.k >= 2:
+            return 'bridges'
+        return None
@@ -1,12 +1,19 @@
+import numpy as np
 import numpy.random as random
 from itertools import combinations
 
+# Status codes of DemandSet
+UNEXECUTED = 0
+SUCCESS = 1
+BLOCKED = -1
+
 class Demand():
     def __init__(self, source, target, data_rate):
         self.source = source
         self.target = target
         self.data_rate = data_rate
         self.links_path = None
+        self.links_index = None
         self.path_length = None
         self.modulation_level = None
         self.frequency_slots = None
@@ -21,23 +28,116 @@ class Demand():
 
     def reset(self):
         self.links_path = None
+        self.links_index = None
         self.path_length = None
         self.modulation_level = None
         self.frequency_slots = None
         self.spectrum_begin = None
         self.status = None
 
-def createRandomDemands(eon, possible_data_rate=[40, 100, 200, 400, 1000], random_state=None):
-    # Shuffle nodes
-    if random_state is not None:
-        random.seed(random_state)
-    # Setting data rate probabilities
+def getRandomGenerator(random_state=None):
+    # Using local generators, never the global numpy state
+    if isinstance(random_state, (random.Generator, random.RandomState)):
+        return random_state
+    if isinstance(random_state, random.SeedSequence):
+        return random.default_rng(random_state)
+    if random_state is None:
+        return random.default_rng()
+    # Integer seeds keep the streams of the former numpy.random.seed
+    return random.RandomState(random_state)
+
+def getDataRateProbabilities(possible_data_rate):
+    # Lower data rates are drawn more often, linearly
     length = len(possible_data_rate)
     total = (length**2 + length)/2
-    p = [x/total for x in range(length, 0, -1)]
-    # Creating demands
-    demands = []
-    for source, target in combinations(eon.nodes(), 2):
-        demands.append(Demand(source, target, random.choice(possible_data_rate, p=p)))
-    random.shuffle(demands)
-    return demands
\ No newline at end of file
+    return [x/total for x in range(length, 0, -1)]
+
+def drawRandomDemands(n_pairs, possible_data_rate, random_state=None):
+    # Drawing every data rate and the demand order at once
+    generator = getRandomGenerator(random_state)
+    p = getDataRateProbabilities(possible_data_rate)
+    data_rate = generator.choice(possible_data_rate, size=n_pairs, p=p)
+    order = generator.permutation(n_pairs)
+    return data_rate, order
+
+def createRandomDemands(eon, possible_data_rate=[40, 100, 200, 400, 1000], random_state=None):
+    pairs = list(combinations(eon.nodes(), 2))
+    data_rate, order = drawRandomDemands(len(pairs), possible_data_rate, random_state)
+    return [Demand(pairs[i][0], pairs[i][1], data_rate[i]) for i in order]
+
+def spawnSeeds(n_sets, random_state=None):
+    # Independent seeds, each one only depends on random_state and its position
+    if not isinstance(random_state, random.SeedSequence):
+        random_state = random.SeedSequence(random_state)
+    return random_state.spawn(n_sets)
+
+class DemandSet():
+    # Demands as columns, indexing nodes by their position in nodes
+    def __init__(self, nodes, source, target, data_rate):
+        self.nodes = list(nodes)
+        self.source = np.asarray(source, dtype=np.intp)
+        self.target = np.asarray(target, dtype=np.intp)
+        self.data_rate = np.asarray(data_rate)
+        self.reset()
+
+    def __repr__(self):
+        return '<%d demands>'%len(self)
+
+    def __str__(self):
+        return '<%d demands>'%len(self)
+
+    def __len__(self):
+        return len(self.source)
+
+    def reset(self):
+        self.k = np.full(len(self), -1, dtype=np.intp)
+        self.modulation_level = np.full(len(self), -1, dtype=np.intp)
+        self.frequency_slots = np.zeros(len(self), dtype=np.intp)
+        self.spectrum_begin = np.full(len(self), -1, dtype=np.intp)
+        self.status = np.full(len(self), UNEXECUTED, dtype=np.int8)
+
+    def toDemands(self, eon=None, modulation_levels=None):
+        # Creating Demand objects as a view of the columns
+        demands = []
+        for i in range(len(self)):
+            demand = Demand(self.nodes[self.source[i]], self.nodes[self.target[i]], self.data_rate[i])
+            if self.status[i] != UNEXECUTED:
+                demand.status = bool(self.status[i] == SUCCESS)
+            if self.k[i] >= 0 and eon is not None:
+                plan = eon.path_plans[demand.source][demand.target][self.k[i]]
+                demand.links_path = plan.links_path
+                demand.links_index = plan.links_index
+                demand.path_length = plan.path_length
+            if self.modulation_level[i] >= 0 and modulation_levels is not None:
+                demand.modulation_level = modulation_levels[self.modulation_level[i]]
+            if self.frequency_slots[i] > 0:
+                demand.frequency_slots = int(self.frequency_slots[i])
+            if self.spectrum_begin[i] >= 0:
+                demand.spectrum_begin = int(self.spectrum_begin[i])
+            demands.append(demand)
+        return demands
+
+def concatenateDemandSets(demand_sets):
+    # Demand sets over the same nodes one after the other, with their results
+    demand_set = DemandSet(demand_sets[0].nodes, np.concatenate([d.source for d in demand_sets]),
+                           np.concatenate([d.target for d in demand_sets]), np.concatenate([d.data_rate for d in demand_sets]))
+    for column in ('k', 'modulation_level', 'frequency_slots', 'spectrum_begin', 'status'):
+        setattr(demand_set, column, np.concatenate([getattr(d, column) for d in demand_sets]))
+    return demand_set
+
+def createDemandSet(demands, nodes):
+    index = {node: i for i, node in enumerate(nodes)}
+    source = [index[demand.source] for demand in demands]
+    target = [index[demand.target] for demand in demands]
+    data_rate = [demand.data_rate for demand in demands]
+    return DemandSet(nodes, source, target, data_rate)
+
+def createRandomDemandSet(eon, possible_data_rate=[40, 100, 200, 400, 1000], random_state=None):
+    # Same demands as createRandomDemands, without creating Demand objects
+    nodes = list(eon.nodes())
+    source, target = np.triu_indices(len(nodes), k=1)
+    data_rate, order = drawRandomDemands(len(source), possible_data_rate, random_state)
+    return DemandSet(nodes, source[order], target[order], data_rate[order])
+
+def createRandomDemandSets(eon, n_sets, possible_data_rate=[40, 100, 200, 400, 1000], random_state=None):
+    return [createRandomDemandSet(eon, possible_data_rate, seed) for seed in spawnSeeds(n_sets, random_state)]
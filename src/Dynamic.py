@@ -0,0 +1,121 @@
+import src.Simulation as Simulation
+import src.Demand as Demand
+from heapq import heappush, heappop
+from statistics import NormalDist
+from math import sqrt
+
+def iterateDynamic(eon, modulation_levels, load, holding_time=1, possible_data_rate=[40, 100, 200, 400, 1000],
+                   interval=10000, warmup=1, max_arrivals=10**6, confidence=0.95, precision=0.05, min_intervals=20,
+                   block_size=1 << 16, random_state=None):
+    # Discrete-event simulation of dynamic traffic: Poisson arrivals between random node pairs at load Erlangs,
+    # exponential holding times, admission by RMLSA and release of the spectrum when connections end.
+    # Yields statistics every interval arrivals, the blocking probability is estimated by batch means over
+    # the intervals after warmup, stopping once its confidence interval is within precision of it.
+    if eon.path_plans is None or eon.plan_modulation_levels is not modulation_levels:
+        eon.compilePathPlans(modulation_levels)
+    eon.resetSpectrum()
+    generator = Demand.getRandomGenerator(random_state)
+    nodes = list(eon.nodes())
+    n_nodes = len(nodes)
+    p = Demand.getDataRateProbabilities(possible_data_rate)
+    z = NormalDist().inv_cdf((1 + confidence) / 2)
+    demand = Demand.Demand(None, None, None)
+
+    # Connection records in pooled lists, a released record is reused by the next admitted connection,
+    # so memory follows the connections in progress and not the number of events
+    record_links = []
+    record_begin = []
+    record_slots = []
+    free_records = []
+    departures = []
+
+    now = 0.0
+    arrivals = 0
+    blocked = 0
+    offered_rate = 0
+    blocked_rate = 0
+    n_intervals = 0
+    # Batch means of the intervals after warmup, with Welford's algorithm
+    batches = 0
+    mean = 0.0
+    m2 = 0.0
+    bandwidth_mean = 0.0
+    while arrivals < max_arrivals:
+        # Drawing events by blocks, the arrival process does not depend on the network state
+        size = min(block_size, max_arrivals - arrivals)
+        gaps = generator.exponential(holding_time / load, size).tolist()
+        holds = generator.exponential(holding_time, size).tolist()
+        sources = (generator.random(size) * n_nodes).astype(int)
+        targets = (generator.random(size) * (n_nodes - 1)).astype(int)
+        targets += targets >= sources
+        data_rates = generator.choice(possible_data_rate, size=size, p=p).tolist()
+        for gap, hold, source, target, data_rate in zip(gaps, holds, sources.tolist(), targets.tolist(), data_rates):
+            now += gap
+            # Releasing connections that ended before this arrival
+            while departures and departures[0][0] <= now:
+                _, record = heappop(departures)
+                eon.releaseSpectrum(record_links[record], record_begin[record], record_slots[record])
+                record_links[record] = None
+                free_records.append(record)
+
+            demand.source = nodes[source]
+            demand.target = nodes[target]
+            demand.data_rate = data_rate
+            Simulation.RMLSA(eon, modulation_levels, demand)
+            if demand.status is True:
+                Simulation.executeDemand(eon, demand)
+                if free_records:
+                    record = free_records.pop()
+                    record_links[record] = demand.links_index
+                    record_begin[record] = demand.spectrum_begin
+                    record_slots[record] = demand.frequency_slots
+                else:
+                    record = len(record_links)
+                    record_links.append(demand.links_index)
+                    record_begin.append(demand.spectrum_begin)
+                    record_slots.append(demand.frequency_slots)
+                heappush(departures, (now + hold, record))
+            else:
+                blocked += 1
+                blocked_rate += data_rate
+            offered_rate += data_rate
+            arrivals += 1
+
+            if arrivals % interval == 0 or arrivals == max_arrivals:
+                interval_blocking = blocked / (arrivals - n_intervals * interval)
+                interval_bandwidth = blocked_rate / offered_rate
+                # A last partial interval is reported but left out of the batch means
+                if n_intervals >= warmup and arrivals % interval == 0:
+                    batches += 1
+                    delta = interval_blocking - mean
+                    mean += delta / batches
+                    m2 += delta * (interval_blocking - mean)
+                    bandwidth_mean += (interval_bandwidth - bandwidth_mean) / batches
+                n_intervals += 1
+                half_width = z * sqrt(m2 / (batches - 1) / batches) if batches > 1 else float('inf')
+                converged = batches >= min_intervals and mean > 0 and half_width <= precision * mean
+                yield {
+                    'interval': n_intervals,
+                    'time': now,
+                    'arrivals': arrivals,
+                    'active': len(departures),
+                    'interval_blocking': interval_blocking,
+                    'interval_bandwidth_blocking': interval_bandwidth,
+                    'blocking_probability': mean if batches else float('nan'),
+                    'bandwidth_blocking_probability': bandwidth_mean if batches else float('nan'),
+                    'half_width': half_width,
+                    'converged': converged,
+                }
+                blocked = 0
+                offered_rate = 0
+                blocked_rate = 0
+                if converged:
+                    return
+
+def simulateDynamic(eon, modulation_levels, load, callback=None, **kwargs):
+    # Running until convergence or max_arrivals, returning the statistics of the last interval
+    statistics = None
+    for statistics in iterateDynamic(eon, modulation_levels, load, **kwargs):
+        if callback is not None:
+            callback(statistics)
+    return statistics
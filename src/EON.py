@@ -1,8 +1,13 @@
 import networkx as nx
-from pandas import read_csv
+import numpy as np
+import os
 from haversine import haversine
 from itertools import islice
-from matplotlib.pyplot import cm
+from collections import ChainMap
+import src.PathPlan as PathPlan
+import src.Spectrum as Spectrum
+import src.Demand as Demand
+import src.TopologyCache as TopologyCache
 
 class EON(nx.Graph):
     # # # # # # # # # # #
@@ -17,6 +22,24 @@ class EON(nx.Graph):
         self.k_paths = k_paths
         self.shortest_path = None
         self.shortest_path_length = None
+        self.path_plans = None
+        self.plan_modulation_levels = None
+        self.plan_data_rates = None
+        self.sorted_modulation_levels = None
+        # Spectrum occupancy, one row per link (0 means free slot)
+        self.spectrum = np.zeros((0, frequency_slots))
+        self.link_index = {}
+        # Rows left by removed links, reused by the next new links
+        self.free_rows = []
+        # Free intervals of every row, built on first use, and the policy choosing among them
+        self.free_intervals = None
+        self.spectrum_policy = 'first_fit'
+        self.spectrum_random = None
+
+    def __setstate__(self, state):
+        # Copies and pickles must point spectrum attributes to their own matrix
+        self.__dict__.update(state)
+        self.bindSpectrum()
 
     def __repr__(self):
         return '<%s>'%self.name
@@ -26,28 +49,39 @@ class EON(nx.Graph):
     
     def loadCSV(self, nodes_csv, links_csv, 
                 node_id='id', node_lat='lat', node_lon='long', node_type='type', 
-                link_source='from', link_target='to', link_length='length'):
+                link_source='from', link_target='to', link_length='length', cache_folder=None):
+        # Reading nodes, links and routes of an empty EON from the cache of these CSVs if there is one
+        cache_path = None
+        if cache_folder is not None and self.number_of_nodes() == 0:
+            cache_path = TopologyCache.getCachePath(self, nodes_csv, links_csv, cache_folder)
+            if TopologyCache.loadTopology(self, cache_path):
+                return
+        # pandas is only loaded by the scripts reading CSVs, not by workers simulating topologies
+        from pandas import read_csv
         # Loading nodes
         if nodes_csv is not None:
             nodes = read_csv(nodes_csv, encoding="ISO-8859-1")
             nodes.columns = [node_id, node_lat, node_lon, node_type] + list(nodes.columns)[4:]
-            for node in nodes.iterrows():
-                node = node[1]
-                self.addNode(node[node_id], node[node_lat], node[node_lon], node[node_type])
+            self.addNodes(nodes[node_id].tolist(), nodes[node_lat].tolist(), nodes[node_lon].tolist(), nodes[node_type].tolist())
         # Loading links
         if links_csv is not None:
             links = read_csv(links_csv, encoding="ISO-8859-1")
             links.columns = [link_source, link_target, link_length] + list(links.columns)[3:]
-            for link in links.iterrows():
-                link = link[1]
-                self.addLink(link[link_source], link[link_target], link[link_length])
-    
+            self.addLinks(links[link_source].tolist(), links[link_target].tolist(), links[link_length].tolist())
+        # Caching with routes, the expensive part to rebuild
+        if cache_path is not None:
+            if self.shortest_path is None:
+                self.initializeRoutes()
+            os.makedirs(cache_folder, exist_ok=True)
+            TopologyCache.saveTopology(self, cache_path)
+
     def createFigure(self):
+        from matplotlib.pyplot import cm
         # Drawing nodes
         nodes_coord = nx.get_node_attributes(self, 'coord')
-        data_rate = nx.get_edge_attributes(self, 'spectrum')
-        for link in data_rate.keys():
-            data_rate[link] = sum(filter(None, data_rate[link]))
+        data_rate = {}
+        for link in self.edges():
+            data_rate[link] = sum(filter(None, self.getSpectrum(link[0], link[1])))
         nx.draw(self, nodes_coord, with_labels=True, font_size=10, node_size=100, edge_color=list(data_rate.values()), edge_cmap=cm.cool) 
         # Drawing length of each link
         labels = nx.get_edge_attributes(self, 'length')
@@ -65,54 +99,262 @@ class EON(nx.Graph):
     
     def addNode(self, id, lat, lon, type):
         nx.Graph.add_node(self, id, lat=lat, lon=lon, type=type, coord=(lat, lon))
+        # A new node is only reachable from itself
+        if self.shortest_path is not None and id not in self.shortest_path:
+            self.shortest_path[id] = {}
+            self.shortest_path_length[id] = {}
+            if self.path_plans is not None:
+                self.path_plans[id] = {}
+            for node in self.nodes():
+                self.setKShortestPaths(id, node, [[id]] if node == id else [])
     
+    def addNodes(self, ids, lats, lons, types):
+        # Bulk addNode, one by one only when routes have to be kept up to date
+        if self.shortest_path is not None:
+            for node in zip(ids, lats, lons, types):
+                self.addNode(*node)
+            return
+        nx.Graph.add_nodes_from(self, ((id, {'lat': lat, 'lon': lon, 'type': type, 'coord': (lat, lon)})
+                                       for id, lat, lon, type in zip(ids, lats, lons, types)))
+
     # # # # # # # # #
     # Links section #
     # # # # # # # # #
     
-    def addLink(self, source, target, length=None):
+    def addLink(self, source, target, length=None, update_routes=True):
+        # Without update_routes, new links leave routes to a later updateRoutes with all of them
         if length is None:
             coord = nx.get_node_attributes(self, 'coord')
             length = haversine(coord[source], coord[target])
         
-        nx.Graph.add_edge(self, source, target, length=length, spectrum=[None]*self.frequency_slots)
+        if self.has_edge(source, target):
+            index = self.link_index[source, target]
+            previous_length = self[source][target]['length']
+            self.spectrum[index] = 0
+        else:
+            previous_length = None
+            if self.free_rows:
+                index = self.free_rows.pop()
+            else:
+                index = len(self.spectrum)
+                self.spectrum = np.vstack((self.spectrum, np.zeros((1, self.frequency_slots))))
+            self.link_index[source, target] = index
+            self.link_index[target, source] = index
+        if self.free_intervals is not None:
+            self.free_intervals.resetRow(index)
+        nx.Graph.add_edge(self, source, target, length=length, index=index)
+        self.bindSpectrum()
+        # Keeping routes up to date if they were already built
+        if self.shortest_path is not None:
+            if previous_length is None:
+                if update_routes:
+                    self.updateRoutes([(source, target)])
+            elif previous_length != length:
+                self.initializeRoutes()
     
+    def addLinks(self, sources, targets, lengths, indices=None):
+        # Bulk addLink for a topology without links yet, with new spectrum rows in link order
+        # unless indices are given, links repeated in the list keep their first row as addLink does
+        if self.number_of_edges() > 0 or self.free_rows or self.shortest_path is not None:
+            for source, target, length in zip(sources, targets, lengths):
+                self.addLink(source, target, length)
+            return
+        coord = None
+        links = {}
+        for source, target, length in zip(sources, targets, lengths):
+            if length is None:
+                if coord is None:
+                    coord = nx.get_node_attributes(self, 'coord')
+                length = haversine(coord[source], coord[target])
+            if (target, source) in links:
+                source, target = target, source
+            links[source, target] = length
+        if indices is None:
+            indices = range(len(self.spectrum), len(self.spectrum) + len(links))
+        self.spectrum = np.zeros((max(indices, default=-1) + 1, self.frequency_slots))
+        self.free_rows = sorted(set(range(len(self.spectrum))) - set(indices), reverse=True)
+        for (source, target), index in zip(links, indices):
+            self.link_index[source, target] = index
+            self.link_index[target, source] = index
+        self.free_intervals = None
+        nx.Graph.add_edges_from(self, ((source, target, {'length': length, 'index': index})
+                                       for ((source, target), length), index in zip(links.items(), indices)))
+        self.bindSpectrum()
+
+    def removeLink(self, source, target):
+        index = self.link_index.pop((source, target))
+        del self.link_index[target, source]
+        self.spectrum[index] = 0
+        if self.free_intervals is not None:
+            self.free_intervals.resetRow(index)
+        self.free_rows.append(index)
+        nx.Graph.remove_edge(self, source, target)
+        # Keeping routes up to date if they were already built
+        if self.shortest_path is not None:
+            self.removeRoutes(source, target)
+
     # # # # # # # # # # # # # # # # #
     # Spectrum and routing section  #
     # # # # # # # # # # # # # # # # #
 
+    def bindSpectrum(self):
+        # Exposing each spectrum row as the link's spectrum attribute,
+        # set free_intervals to None after writing to them directly
+        for source, target, index in self.edges(data='index'):
+            self[source][target]['spectrum'] = self.spectrum[index]
+
+    def getSpectrum(self, source, target):
+        return self.spectrum[self.link_index[source, target]]
+
     def resetSpectrum(self):
-        links = list(self.edges())
-        for link in links:
-            self.edges[link[0], link[1]]['spectrum'] = [None]*self.frequency_slots
+        self.spectrum[:] = 0
+        if self.free_intervals is not None:
+            self.free_intervals.reset(len(self.spectrum))
+
+    def getFreeIntervals(self):
+        if self.free_intervals is None:
+            self.free_intervals = Spectrum.FreeIntervals(self.spectrum)
+        return self.free_intervals
+
+    def setSpectrumPolicy(self, policy, random_state=None):
+        if policy not in Spectrum.policies:
+            raise ValueError('Unknown spectrum policy %s, expected one of %s' % (policy, ', '.join(Spectrum.policies)))
+        self.spectrum_policy = policy
+        self.spectrum_random = Demand.getRandomGenerator(random_state)
+
+    def assignSpectrum(self, links_index, frequency_slots):
+        # First slot of the block the spectrum policy picks for the path, None if nothing fits
+        policy = Spectrum.policies[self.spectrum_policy]
+        return policy(self.getFreeIntervals(), links_index, frequency_slots, self.spectrum_random)
+
+    def allocateSpectrum(self, links_index, spectrum_begin, frequency_slots, value):
+        self.spectrum[links_index, spectrum_begin:spectrum_begin+frequency_slots] = value
+        if self.free_intervals is not None:
+            if value:
+                self.free_intervals.allocate(self.spectrum, links_index, spectrum_begin, frequency_slots)
+            else:
+                self.free_intervals.release(self.spectrum, links_index, spectrum_begin, frequency_slots)
+
+    def releaseSpectrum(self, links_index, spectrum_begin, frequency_slots):
+        self.allocateSpectrum(links_index, spectrum_begin, frequency_slots, 0)
+
+    def getLinkFragmentation(self):
+        # Free slots, free blocks, largest free block and fragmentation of every link
+        metrics = self.getFreeIntervals().getFragmentation()
+        fragmentation = {}
+        for source, target, index in self.edges(data='index'):
+            fragmentation[source, target] = {name: values[index].item() for name, values in metrics.items()}
+        return fragmentation
     
     def createKShortestPaths(self, source, target):
-        if source not in self.shortest_path.keys():
-            self.shortest_path[source] = {}
-            self.shortest_path_length[source] = {}
-        try:
-            self.shortest_path[source][target] = list(islice(nx.shortest_simple_paths(self, source, target, weight='length'), self.k_paths))
-        except nx.exception.NetworkXNoPath:
-            self.shortest_path[source][target] = []
-        self.shortest_path_length[source][target] = []
-        # Calculating lengths
-        for path in self.shortest_path[source][target]:
+        if source == target:
+            paths = [[source]]
+        else:
+            try:
+                paths = list(islice(nx.shortest_simple_paths(self, source, target, weight='length'), self.k_paths))
+            except nx.exception.NetworkXNoPath:
+                paths = []
+        self.setKShortestPaths(source, target, paths)
+
+    def setKShortestPaths(self, source, target, paths):
+        # Storing paths and lengths for both directions of the pair
+        lengths = []
+        for path in paths:
             length = 0
             for i in range(len(path)-1):
-                try:
-                    link = self[path[i]][path[i+1]]
-                except:
-                    link = self[path[i+1]][path[i]]
-                length += link['length']
-            self.shortest_path_length[source][target].append(length)
-    
+                length += self[path[i]][path[i+1]]['length']
+            lengths.append(length)
+        self.shortest_path[source][target] = paths
+        self.shortest_path_length[source][target] = lengths
+        if source != target:
+            self.shortest_path[target][source] = [path[::-1] for path in paths]
+            self.shortest_path_length[target][source] = list(lengths)
+        if self.path_plans is not None:
+            self.createPathPlans(source, target)
+
     def initializeRoutes(self):
-        self.shortest_path = {}
-        self.shortest_path_length = {}
-        for source in self.nodes():
-            for target in self.nodes():
+        nodes = list(self.nodes())
+        self.shortest_path = {node: {} for node in nodes}
+        self.shortest_path_length = {node: {} for node in nodes}
+        if self.path_plans is not None:
+            self.path_plans = {node: {} for node in nodes}
+        for i, source in enumerate(nodes):
+            for target in nodes[i:]:
                 self.createKShortestPaths(source, target)
-                self.createKShortestPaths(target, source)
+
+    def getRouteBounds(self, nodes):
+        # Shortest and k-th shortest lengths of every pair (inf when missing)
+        shortest = np.full((len(nodes), len(nodes)), np.inf)
+        kth = np.full((len(nodes), len(nodes)), np.inf)
+        for i, source in enumerate(nodes):
+            lengths = self.shortest_path_length[source]
+            for j, target in enumerate(nodes):
+                if lengths[target]:
+                    shortest[i, j] = lengths[target][0]
+                    if len(lengths[target]) == self.k_paths:
+                        kth[i, j] = lengths[target][-1]
+        return shortest, kth
+
+    def updateRoutes(self, links):
+        # Recomputing only the pairs whose k best paths could use one of the new links: a path through
+        # a link is at least as long as the shortest way to it, the link and the shortest way from it,
+        # with distances of the graph holding every new link. Pairs that cannot reach any new link
+        # (an infinite bound) keep their routes, and when most pairs change routes are rebuilt at once.
+        if self.shortest_path is None:
+            self.initializeRoutes()
+            return []
+        nodes = list(self.nodes())
+        position = {node: i for i, node in enumerate(nodes)}
+        shortest, kth = self.getRouteBounds(nodes)
+        ends = [(position[source], position[target], self[source][target]['length']) for source, target in links]
+        distances = shortest.copy()
+        for s, t, length in ends:
+            np.minimum(distances, np.minimum(distances[:, s, None] + distances[None, t, :], distances[:, t, None] + distances[None, s, :]) + length, out=distances)
+        bound = np.full_like(distances, np.inf)
+        for s, t, length in ends:
+            np.minimum(bound, np.minimum(distances[:, s, None] + distances[None, t, :], distances[:, t, None] + distances[None, s, :]) + length, out=bound)
+        pairs = np.argwhere(np.triu(np.isfinite(bound) & (bound <= kth), k=1))
+        if 2*len(pairs) > len(nodes) * (len(nodes) - 1) // 2:
+            self.initializeRoutes()
+            return [(nodes[i], nodes[j]) for i in range(len(nodes)) for j in range(i+1, len(nodes))]
+        for i, j in pairs.tolist():
+            self.createKShortestPaths(nodes[i], nodes[j])
+        return [(nodes[i], nodes[j]) for i, j in pairs.tolist()]
+
+    def removeRoutes(self, source, target):
+        # Recomputing only the pairs whose k best paths used the removed link, the others are still the best
+        nodes = list(self.nodes())
+        pairs = []
+        for i, u in enumerate(nodes):
+            paths = self.shortest_path[u]
+            for v in nodes[i+1:]:
+                for path in paths[v]:
+                    if source in path and target in path and any({path[h], path[h+1]} == {source, target} for h in range(len(path)-1)):
+                        pairs.append((u, v))
+                        break
+        for u, v in pairs:
+            self.createKShortestPaths(u, v)
+        return pairs
+
+    def compilePathPlans(self, modulation_levels, data_rates=[40, 100, 200, 400, 1000]):
+        # Resolving everything that does not depend on spectrum once per topology
+        if self.shortest_path is None:
+            self.initializeRoutes()
+        self.plan_modulation_levels = modulation_levels
+        self.plan_data_rates = data_rates
+        self.sorted_modulation_levels = PathPlan.sortModulationLevels(modulation_levels)
+        nodes = list(self.nodes())
+        self.path_plans = {node: {} for node in nodes}
+        for i, source in enumerate(nodes):
+            for target in nodes[i:]:
+                self.createPathPlans(source, target)
+
+    def createPathPlans(self, source, target):
+        for s, t in ((source, target), (target, source)):
+            plans = []
+            for path, length in zip(self.shortest_path[s][t], self.shortest_path_length[s][t]):
+                plans.append(PathPlan.createPathPlan(self, path, length, self.sorted_modulation_levels, self.plan_data_rates))
+            self.path_plans[s][t] = plans
 
     def save(self, folder='', save_report=False, save_figure=False):
         eon_df = nx.convert_matrix.to_pandas_edgelist(self, source='from', target='to')
@@ -123,4 +365,72 @@ class EON(nx.Graph):
             if save_figure:
                 self.save_figure(folder=folder)
         except:
-            print('Error saving network reports!')
\ No newline at end of file
+            print('Error saving network reports!')
+
+class EONOverlay(EON):
+    # Candidate topology referencing an immutable base EON, storing only the
+    # added links, its own spectrum and the routes that changed. Edge data of
+    # base links is layered over the base's, holding the overlay's spectrum rows.
+
+    def __init__(self, base, name=None):
+        nx.Graph.__init__(self)
+
+        self.base = base
+        self.name = base.name if name is None else name
+        self.frequency_slots = base.frequency_slots
+        self.k_paths = base.k_paths
+        # Sharing node and adjacency entries, link indices layered over the base
+        self._node = dict(base._node)
+        self._adj = dict(base._adj)
+        self.link_index = ChainMap({}, base.link_index)
+        self.free_rows = []
+        self.spectrum = np.zeros_like(base.spectrum)
+        self.free_intervals = None
+        self.spectrum_policy = base.spectrum_policy
+        self.spectrum_random = base.spectrum_random
+        if base.shortest_path is None:
+            self.shortest_path = None
+            self.shortest_path_length = None
+        else:
+            self.shortest_path = {node: ChainMap({}, paths) for node, paths in base.shortest_path.items()}
+            self.shortest_path_length = {node: ChainMap({}, lengths) for node, lengths in base.shortest_path_length.items()}
+        self.plan_modulation_levels = base.plan_modulation_levels
+        self.plan_data_rates = base.plan_data_rates
+        self.sorted_modulation_levels = base.sorted_modulation_levels
+        if base.path_plans is None:
+            self.path_plans = None
+        else:
+            self.path_plans = {node: ChainMap({}, plans) for node, plans in base.path_plans.items()}
+        self.bindSpectrum()
+
+    def touchNode(self, node):
+        # Giving the node its own adjacency layer before writing to it
+        if node in self.base._adj and self._adj[node] is self.base._adj[node]:
+            self._adj[node] = ChainMap({}, self.base._adj[node])
+
+    def addLink(self, source, target, length=None, update_routes=True):
+        self.touchNode(source)
+        self.touchNode(target)
+        if self.base.has_edge(source, target) and (source, target) not in self.link_index.maps[0]:
+            data = dict(self._adj[source][target])
+            self._adj[source][target] = data
+            self._adj[target][source] = data
+        EON.addLink(self, source, target, length, update_routes)
+
+    def bindSpectrum(self):
+        # Base links get their own edge data layer on first binding, so writing
+        # the attribute never reaches the base
+        owned = self.link_index.maps[0]
+        for source, target, index in self.base.edges(data='index'):
+            if (source, target) in owned:
+                continue
+            data = self._adj[source][target]
+            if data is self.base._adj[source][target]:
+                self.touchNode(source)
+                self.touchNode(target)
+                data = ChainMap({}, data)
+                self._adj[source][target] = data
+                self._adj[target][source] = data
+            data['spectrum'] = self.spectrum[index]
+        for (source, target), index in owned.items():
+            self._adj[source][target]['spectrum'] = self.spectrum[index]
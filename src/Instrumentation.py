@@ -0,0 +1,190 @@
+import src.Combinations as Combinations
+import src.Simulation as Simulation
+import src.Report as Report
+import src.Results as Results
+import src.Demand as Demand
+from src.EON import EON
+from collections import Counter
+import numpy as np
+from time import perf_counter, monotonic
+import json
+
+# Instrumentation wraps the functions of each stage while enabled and puts the originals back
+# when disabled, so it costs nothing when off. Stage times are inclusive: a stage calling
+# another one (route updates while creating a candidate) counts that time too.
+enabled = False
+stages = {}
+counters = Counter()
+start_time = None
+_originals = []
+
+def countCandidate(result, args, kwargs):
+    counters['candidates_generated'] += 1
+    if result is None:
+        counters['candidates_rejected'] += 1
+
+def getBlockingReason(eon, source, target):
+    plans = eon.path_plans[source][target][:eon.k_paths]
+    if not plans:
+        return 'blocked_no_route'
+    if all(plan.modulation_level is None for plan in plans):
+        return 'blocked_no_reach'
+    return 'blocked_no_spectrum'
+
+def countDemand(result, args, kwargs):
+    eon, demand = args[0], args[2]
+    counters['demands_simulated'] += 1
+    if demand.status is True:
+        plans = eon.path_plans[demand.source][demand.target]
+        k = next(k for k, plan in enumerate(plans) if plan.links_index is demand.links_index)
+        counters['k_%d' % k] += 1
+    else:
+        counters[getBlockingReason(eon, demand.source, demand.target)] += 1
+
+def countDemandSet(eon, demand_set, start=0, stop=None):
+    # Load sweeps simulate a demand set in ranges, only the first one counts as a candidate
+    if start == 0:
+        counters['candidates_simulated'] += 1
+    status = demand_set.status[start:stop]
+    counters['demands_simulated'] += len(status)
+    successes = status == Demand.SUCCESS
+    for k, count in enumerate(np.bincount(demand_set.k[start:stop][successes])):
+        if count:
+            counters['k_%d' % k] += int(count)
+    nodes = demand_set.nodes
+    for i in (start + np.flatnonzero(status == Demand.BLOCKED)).tolist():
+        counters[getBlockingReason(eon, nodes[demand_set.source[i]], nodes[demand_set.target[i]])] += 1
+
+def countSimulation(result, args, kwargs):
+    arguments = dict(zip(('start', 'stop'), args[3:]), **kwargs)
+    countDemandSet(args[0], args[2], arguments.get('start', 0), arguments.get('stop'))
+
+def countBatch(result, args, kwargs):
+    for eon, demand_set in zip(args[0], result):
+        countDemandSet(eon, demand_set)
+
+def getTargets():
+    # Owner, attribute, stage and what to count from the result
+    return [
+        (Combinations, 'createPossibleEON', 'create_candidate', countCandidate),
+        (Combinations, 'isKEdgeConnected', 'connectivity', None),
+        (EON, 'initializeRoutes', 'initialize_routes', None),
+        (EON, 'updateRoutes', 'update_routes', None),
+        (EON, 'removeRoutes', 'update_routes', None),
+        (EON, 'compilePathPlans', 'compile_path_plans', None),
+        (Simulation, 'RMLSA', 'rmlsa', countDemand),
+        (Simulation, 'executeDemand', 'execute_demand', None),
+        (Simulation, 'simulateDemandSet', 'simulate_demand_set', countSimulation),
+        (Simulation, 'simulateBatch', 'simulate_batch', countBatch),
+        (Report, 'CSVdata', 'metrics', None),
+        (Report, 'survivabilityData', 'survivability', None),
+        (Report, 'writeCSV', 'write_csv', None),
+        (Report, 'writeRows', 'write_csv', None),
+        (Results.ResultsWriter, 'flush', 'write_csv', None),
+    ]
+
+def wrap(function, stage, count):
+    timer = stages.setdefault(stage, [0.0, 0])
+    def wrapper(*args, **kwargs):
+        start = perf_counter()
+        result = function(*args, **kwargs)
+        timer[0] += perf_counter() - start
+        timer[1] += 1
+        if count is not None:
+            count(result, args, kwargs)
+        return result
+    wrapper.__wrapped__ = function
+    return wrapper
+
+def enable(value=True):
+    global enabled, start_time
+    if not value:
+        return disable()
+    if enabled:
+        return
+    for owner, name, stage, count in getTargets():
+        function = owner.__dict__[name]
+        _originals.append((owner, name, function))
+        setattr(owner, name, wrap(function, stage, count))
+    enabled = True
+    if start_time is None:
+        start_time = monotonic()
+
+def disable():
+    global enabled
+    while _originals:
+        owner, name, function = _originals.pop()
+        setattr(owner, name, function)
+    enabled = False
+
+def reset():
+    # Keeping the timer lists the wrappers hold, only zeroing them
+    global start_time
+    for timer in stages.values():
+        timer[0] = 0.0
+        timer[1] = 0
+    counters.clear()
+    start_time = monotonic() if enabled else None
+
+def collect():
+    # Snapshot taken and cleared by a worker, for the parent process to merge
+    if not enabled:
+        return None
+    snapshot = {'stages': {stage: list(timer) for stage, timer in stages.items() if timer[1]}, 'counters': dict(counters)}
+    for timer in stages.values():
+        timer[0] = 0.0
+        timer[1] = 0
+    counters.clear()
+    return snapshot
+
+def merge(snapshot):
+    if snapshot is None:
+        return
+    for stage, (seconds, calls) in snapshot['stages'].items():
+        timer = stages.setdefault(stage, [0.0, 0])
+        timer[0] += seconds
+        timer[1] += calls
+    counters.update(snapshot['counters'])
+
+def summary():
+    return {
+        'wall_time': monotonic() - start_time if start_time is not None else None,
+        'stages': {stage: {'seconds': seconds, 'calls': calls, 'mean': seconds / calls}
+                   for stage, (seconds, calls) in sorted(stages.items(), key=lambda item: -item[1][0]) if calls},
+        'counters': dict(sorted(counters.items())),
+    }
+
+def writeSummary(path, extra={}):
+    with open(path, 'w') as file:
+        json.dump(dict(summary(), **extra), file, indent=2)
+
+def formatTime(seconds):
+    seconds = int(seconds)
+    return '%d:%02d:%02d' % (seconds // 3600, seconds % 3600 // 60, seconds % 60)
+
+class Progress():
+    # Progress lines every interval seconds while done goes up to total
+    def __init__(self, total, interval=10, output=print):
+        self.total = total
+        self.interval = interval
+        self.output = output
+        self.done = 0
+        self.simulated = 0
+        self.start = monotonic()
+        self.last = self.start
+
+    def update(self, done, simulated=0):
+        self.done = done
+        self.simulated += simulated
+        now = monotonic()
+        if self.interval is not None and now - self.last >= self.interval:
+            self.last = now
+            self.output(self.format(now))
+
+    def format(self, now=None):
+        elapsed = (now or monotonic()) - self.start
+        rate = self.done / elapsed if elapsed > 0 else 0
+        eta = formatTime((self.total - self.done) / rate) if rate > 0 else '?'
+        return '%d/%d candidates (%.1f%%), %d simulated, %.1f candidates/s, %.1f simulated/s, ETA %s' % (
+            self.done, self.total, 100 * self.done / self.total if self.total else 100, self.simulated,
+            rate, self.simulated / elapsed if elapsed > 0 else 0, eta)
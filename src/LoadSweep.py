@@ -0,0 +1,89 @@
+import src.Simulation as Simulation
+import src.Demand as Demand
+import numpy as np
+
+# Load points of a topology as prefixes of one demand sequence: the demand set repeated in rounds,
+# so load multiplier m is its first m times n demands. With a fixed order the spectrum left by a
+# prefix does not depend on what comes after it, so each point only simulates the demands past
+# the previous one, over routes and path plans built once.
+
+class LoadSweep():
+    def __init__(self, eon, modulation_levels, demand_set):
+        self.eon = eon
+        self.modulation_levels = modulation_levels
+        self.round = Demand.DemandSet(demand_set.nodes, demand_set.source, demand_set.target, demand_set.data_rate)
+        self.round_size = len(demand_set)
+        self.sequence = self.round
+        self.simulated = 0
+        # Blocks, offered and blocked data rate of every prefix
+        self.blocks = np.zeros(1, dtype=np.intp)
+        self.offered = np.zeros(1)
+        self.blocked_rate = np.zeros(1)
+        if eon.path_plans is None or eon.plan_modulation_levels is not modulation_levels:
+            eon.compilePathPlans(modulation_levels)
+        eon.resetSpectrum()
+
+    def getDemands(self, multiplier):
+        return int(round(multiplier * self.round_size))
+
+    def extend(self, n_demands):
+        # Adding rounds up to n_demands and simulating only the demands not simulated yet
+        if n_demands > len(self.sequence):
+            rounds = -(-n_demands // self.round_size) - len(self.sequence) // self.round_size
+            self.sequence = Demand.concatenateDemandSets([self.sequence] + [self.round]*rounds)
+        if n_demands <= self.simulated:
+            return
+        Simulation.simulateDemandSet(self.eon, self.modulation_levels, self.sequence, start=self.simulated, stop=n_demands)
+        blocked = self.sequence.status[self.simulated:n_demands] == Demand.BLOCKED
+        data_rate = self.sequence.data_rate[self.simulated:n_demands]
+        self.blocks = np.concatenate((self.blocks, self.blocks[-1] + np.cumsum(blocked)))
+        self.offered = np.concatenate((self.offered, self.offered[-1] + np.cumsum(data_rate)))
+        self.blocked_rate = np.concatenate((self.blocked_rate, self.blocked_rate[-1] + np.cumsum(np.where(blocked, data_rate, 0))))
+        self.simulated = n_demands
+
+    def getPoint(self, n_demands):
+        # Same metrics as Report.fromDemands for the first n_demands, and the bandwidth blocking
+        self.extend(n_demands)
+        blocks = int(self.blocks[n_demands])
+        offered = float(self.offered[n_demands])
+        blocked_rate = float(self.blocked_rate[n_demands])
+        return {
+            'load': n_demands / self.round_size,
+            'demands': n_demands,
+            'total_data_rate': offered - blocked_rate,
+            'successes': n_demands - blocks,
+            'blocks': blocks,
+            'success_rate': (n_demands - blocks) / n_demands if n_demands > 0 else None,
+            'blocking_coefficient': blocks / n_demands if n_demands > 0 else None,
+            'bandwidth_blocking': blocked_rate / offered if offered > 0 else None,
+        }
+
+def sweepLoad(eon, modulation_levels, demand_set, multipliers=None, n_demands=None):
+    # Points at load multipliers or at numbers of demands, simulated in increasing order and
+    # returned in the given one
+    sweep = LoadSweep(eon, modulation_levels, demand_set)
+    if n_demands is None:
+        n_demands = [sweep.getDemands(multiplier) for multiplier in multipliers]
+    points = {n: sweep.getPoint(n) for n in sorted(set(n_demands))}
+    return [points[n] for n in n_demands]
+
+def findLoadThreshold(eon, modulation_levels, demand_set, target, metric='blocking_coefficient', multiplier=1, max_multiplier=64):
+    # Lowest number of demands at which metric reaches target, None if it does not by max_multiplier.
+    # The load doubles until it does, then the last interval is bisected, every point in it is
+    # already simulated. Blocking of a prefix is not monotone, so the crossing found may not be the first.
+    sweep = LoadSweep(eon, modulation_levels, demand_set)
+    max_demands = sweep.getDemands(max_multiplier)
+    low = 0
+    high = min(max(1, sweep.getDemands(multiplier)), max_demands)
+    while sweep.getPoint(high)[metric] < target:
+        if high >= max_demands:
+            return None
+        low = high
+        high = min(2*high, max_demands)
+    while high - low > 1:
+        middle = (low + high) // 2
+        if sweep.getPoint(middle)[metric] >= target:
+            high = middle
+        else:
+            low = middle
+    return sweep.getPoint(high)
@@ -1,5 +1,3 @@
-from pandas import read_csv
-
 class ModulationLevel:
     def __init__(self, name, data_rate, power_consumption, reach, spectral_efficiency):
         self.name = name
@@ -15,6 +13,7 @@ class ModulationLevel:
         return '<%s>'%self.name
 
 def loadModulationLevels(modulation_levels_csv):
+    from pandas import read_csv
     ml_df = read_csv(modulation_levels_csv)
     
     modulation_levels = []
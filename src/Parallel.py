@@ -0,0 +1,173 @@
+import src.Combinations as Combinations
+import src.Simulation as Simulation
+import src.Report as Report
+import src.Results as Results
+import src.Demand as Demand
+import src.Instrumentation as Instrumentation
+import src.Survivability as Survivability
+from src.EON import EONOverlay
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque, Counter
+from os import cpu_count
+
+# Worker state, sent once per process by the pool initializer
+_eon = None
+_modulation_levels = None
+_demands = None
+_k_edge_connected = None
+_candidate_filter = None
+_batch_size = 1
+_survivability = False
+_failures = None
+
+def initializeWorker(eon, modulation_levels, demands, max_length=None, k_edge_connected=None, batch_size=1, instrument=False, survivability=False):
+    global _eon, _modulation_levels, _demands, _k_edge_connected, _candidate_filter, _batch_size, _survivability
+    # Forked workers inherit the parent's instrumentation, spawned ones are told to enable it
+    Instrumentation.enable(instrument)
+    Instrumentation.reset()
+    if eon.plan_modulation_levels is not modulation_levels:
+        eon.compilePathPlans(modulation_levels)
+    _eon = eon
+    _modulation_levels = modulation_levels
+    _demands = demands
+    _k_edge_connected = Combinations.getExactCheck(k_edge_connected)
+    _candidate_filter = Combinations.CandidateFilter(eon, Combinations.getCandidateLinks(eon, max_length), k_edge_connected)
+    _batch_size = batch_size
+    _survivability = survivability
+
+def simulateChunk(chunk):
+    # Chunks are index ranges of the candidate space, workers unrank them locally
+    n_links, offset, start, stop = chunk
+    rows = []
+    batch = []
+    counters = _candidate_filter.counters = Counter()
+    for i, links in _candidate_filter.iterate(n_links, start=start, stop=stop):
+        possible_eon = Combinations.createPossibleEON(_eon, links, k_edge_connected=_k_edge_connected, counters=counters)
+        if possible_eon is not None:
+            batch.append((offset + i, possible_eon))
+        if len(batch) >= _batch_size:
+            rows += simulateCandidates(batch)
+            batch = []
+    if batch:
+        rows += simulateCandidates(batch)
+    return rows, counters, (offset + start, offset + stop - 1), Instrumentation.collect()
+
+def simulateCandidates(batch):
+    rows = []
+    if len(batch) == 1:
+        id, possible_eon = batch[0]
+        Simulation.simulateDemandSet(possible_eon, _modulation_levels, _demands)
+        results = [_demands]
+    else:
+        results = Simulation.simulateBatch([possible_eon for _, possible_eon in batch], _modulation_levels, _demands, update_spectrum=False)
+    for (id, possible_eon), result in zip(batch, results):
+        data = Report.CSVdata(possible_eon, result, id=id, survivability=_survivability)
+        if data is not None:
+            rows.append(data)
+    return rows
+
+def simulateSeed(seed):
+    # Each seed gets its own demands and an empty copy of the topology
+    demand_set = Demand.createRandomDemandSet(_eon, random_state=seed)
+    Simulation.simulateDemandSet(EONOverlay(_eon), _modulation_levels, demand_set)
+    return Report.fromDemands(demand_set)
+
+def simulateSeeds(eon, modulation_levels, n_sets, random_state=None, workers=None):
+    # Blocking over independent demand sets, reproducible whatever the scheduling
+    if workers is None:
+        workers = cpu_count()
+    if eon.path_plans is None or eon.plan_modulation_levels is not modulation_levels:
+        eon.compilePathPlans(modulation_levels)
+    seeds = Demand.spawnSeeds(n_sets, random_state)
+    with ProcessPoolExecutor(max_workers=workers, initializer=initializeWorker, initargs=(eon, modulation_levels, None)) as executor:
+        return list(executor.map(simulateSeed, seeds))
+
+def initializeFailureWorker(eon, demands, recompute_routes=True):
+    global _eon, _failures
+    # Every worker rebuilds the spectrum of the simulated demands on its own copy
+    connections, n_demands, n_blocks = Survivability.getConnections(eon, demands)
+    Survivability.allocateConnections(eon, connections)
+    _eon = eon
+    _failures = (connections, Survivability.getCrossingConnections(connections), n_demands, n_blocks, recompute_routes)
+
+def simulateFailureChunk(links):
+    connections, crossing, n_demands, n_blocks, recompute_routes = _failures
+    return [(link, Survivability.evaluateFailure(_eon, connections, crossing, link, n_demands, n_blocks, recompute_routes)) for link in links]
+
+def simulateFailures(eon, demands, workers=None, recompute_routes=True, chunk_size=None):
+    # Every single link failure of a simulated topology, failures spread over the pool
+    if workers is None:
+        workers = cpu_count()
+    links = list(eon.edges())
+    if chunk_size is None:
+        chunk_size = max(1, len(links) // (4*workers))
+    chunks = [links[i:i + chunk_size] for i in range(0, len(links), chunk_size)]
+    failures = {}
+    with ProcessPoolExecutor(max_workers=workers, initializer=initializeFailureWorker, initargs=(eon, demands, recompute_routes)) as executor:
+        for results in executor.map(simulateFailureChunk, chunks):
+            failures.update(results)
+    return failures
+
+def getChunks(eon, links_list, max_length=None, start=0, stop=None, chunk_size=None, n_chunks=64):
+    # Candidate ids are global over links_list, each n_links taking a contiguous range
+    offset = 0
+    for n_links in links_list:
+        total = Combinations.countPossibleNewLinks(eon, max_length=max_length, n_links=n_links)
+        first = max(start - offset, 0)
+        last = total if stop is None else min(stop - offset, total)
+        # Most ids may be pruned by the filter, so by default ranges grow with the space
+        size = chunk_size or max(64, (last - first) // n_chunks)
+        for i in range(first, last, size):
+            yield (n_links, offset, i, min(i + size, last))
+        offset += total
+
+def orderedMap(executor, function, iterable, max_pending):
+    # Like executor.map, but only keeps max_pending tasks in flight
+    pending = deque()
+    for item in iterable:
+        pending.append(executor.submit(function, item))
+        if len(pending) >= max_pending:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+def simulate(eon, modulation_levels, demands, links_list, csv_name, folder='', max_length=None,
+             k_edge_connected=None, start=0, stop=None, workers=None, chunk_size=None, batch_size=32,
+             formats=('csv',), buffer_size=4096, instrument=False, progress_interval=None, output=print, survivability=False):
+    if workers is None:
+        workers = cpu_count()
+    if instrument:
+        Instrumentation.enable()
+
+    # Building base routes and path plans once, candidates only update them
+    if eon.path_plans is None or eon.plan_modulation_levels is not modulation_levels:
+        eon.compilePathPlans(modulation_levels)
+
+    # Sharing demands as columns, results are never written back to them
+    if not isinstance(demands, Demand.DemandSet):
+        demands = Demand.createDemandSet(demands, eon.nodes())
+
+    # Only this process writes, workers send their rows back with the range of ids they covered
+    fieldnames = Report.index + Report.survivability_index if survivability else Report.index
+    with Results.ResultsWriter(csv_name, folder=folder, fieldnames=fieldnames, formats=formats, buffer_size=buffer_size) as writer:
+        # Resuming over the ids no earlier run completed, whatever its start and stop
+        total = sum(Combinations.countPossibleNewLinks(eon, max_length=max_length, n_links=n_links) for n_links in links_list)
+        if stop is not None:
+            total = min(total, stop)
+        missing = writer.getMissingRanges(start, total)
+        chunks = (chunk for first, last in missing
+                  for chunk in getChunks(eon, links_list, max_length=max_length, start=first, stop=last, chunk_size=chunk_size, n_chunks=64*workers))
+        initargs = (eon, modulation_levels, demands, max_length, k_edge_connected, batch_size, Instrumentation.enabled, survivability)
+        counters = Counter()
+        done = 0
+        progress = Instrumentation.Progress(sum(last - first for first, last in missing), interval=progress_interval, output=output)
+        with ProcessPoolExecutor(max_workers=workers, initializer=initializeWorker, initargs=initargs) as executor:
+            for rows, chunk_counters, completed, snapshot in orderedMap(executor, simulateChunk, chunks, 4*workers):
+                counters.update(chunk_counters)
+                Instrumentation.merge(snapshot)
+                writer.writeRows(rows, completed=completed)
+                done += completed[1] + 1 - completed[0]
+                progress.update(done, len(rows))
+        if progress_interval is not None:
+            output(progress.format())
+    return counters
@@ -0,0 +1,54 @@
+import numpy as np
+from bisect import bisect_left
+from math import ceil
+
+class PathPlan:
+    def __init__(self, nodes_path, links_path, links_index, path_length, modulation_level, data_rates=[]):
+        self.nodes_path = nodes_path
+        self.links_path = links_path
+        self.links_index = links_index
+        self.path_length = path_length
+        self.modulation_level = modulation_level
+        self.frequency_slots = {}
+        for data_rate in data_rates:
+            self.getFrequencySlots(data_rate)
+
+    def __repr__(self):
+        return '<%s to %s: %d Km>'%(self.nodes_path[0], self.nodes_path[-1], self.path_length)
+
+    def __str__(self):
+        return '<%s to %s: %d Km>'%(self.nodes_path[0], self.nodes_path[-1], self.path_length)
+
+    def getFrequencySlots(self, data_rate):
+        frequency_slots = self.frequency_slots.get(data_rate)
+        if frequency_slots is None and self.modulation_level is not None:
+            frequency_slots = ceil(data_rate / self.modulation_level.data_rate)
+            self.frequency_slots[data_rate] = frequency_slots
+        return frequency_slots
+
+def sortModulationLevels(modulation_levels):
+    # Sorting by reach, keeping the best data rate among levels that reach at least as far
+    order = sorted(range(len(modulation_levels)), key=lambda i: modulation_levels[i].reach)
+    reaches = [modulation_levels[i].reach for i in order]
+    best = [None]*len(order)
+    current = None
+    for position in range(len(order)-1, -1, -1):
+        i = order[position]
+        # Ties keep the first level in the given order
+        if current is None or (modulation_levels[i].data_rate, -i) > (modulation_levels[current].data_rate, -current):
+            current = i
+        best[position] = modulation_levels[current]
+    return reaches, best
+
+def getModulationLevel(sorted_levels, path_length):
+    reaches, best = sorted_levels
+    position = bisect_left(reaches, path_length)
+    if position == len(best):
+        return None
+    return best[position]
+
+def createPathPlan(eon, nodes_path, path_length, sorted_levels, data_rates=[]):
+    links_path = [(nodes_path[i], nodes_path[i+1]) for i in range(len(nodes_path)-1)]
+    links_index = np.array([eon.link_index[link] for link in links_path], dtype=np.intp)
+    modulation_level = getModulationLevel(sorted_levels, path_length)
+    return PathPlan(nodes_path, links_path, links_index, path_length, modulation_level, data_rates)
@@ -1,10 +1,16 @@
 import networkx as nx
+import numpy as np
+import src.Demand as Demand
+import src.Survivability as Survivability
 from statistics import mean, variance
-import json
 import csv
 
 index = ['', 'mean_degree', 'degree_variance', 'density', 'radius_by_hops', 'diameter_by_hops', 'min_length', 'max_length', 'radius_by_length', 'diameter_by_length', 'total_data_rate', 'blocking_coefficient']
 
+# Optional columns, written when fieldnames include them
+fragmentation_index = ['spectrum_utilization', 'mean_fragmentation', 'max_fragmentation', 'mean_free_blocks']
+survivability_index = ['mean_failure_blocking', 'worst_failure_blocking', 'restorability']
+
 def meanDegree(eon, degrees=None):
     if degrees is None:
         degrees = nx.degree(eon)
@@ -42,39 +48,88 @@ def writeCSV(eon, demands, csv_name, id=None, folder=''):
     data = CSVdata(eon, demands, id=id)
 
     if data is not None:
-        results_csv = folder + csv_name + '.csv'
-        with open(results_csv, 'a', newline='') as file:
-            writer = csv.DictWriter(file, fieldnames=index)
-            writer.writerow(data)
-        file.close()
+        writeRows([data], csv_name, folder=folder)
+
+def writeRows(rows, csv_name, folder=''):
+    results_csv = folder + csv_name + '.csv'
+    with open(results_csv, 'a', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=index)
+        writer.writerows(rows)
+    file.close()
         
-def CSVdata(eon, demands, id=None):
-    try:
-        lengths = list(nx.get_edge_attributes(eon, 'length').values())
-        degrees = nx.degree(eon)
-        demands_report = fromDemands(demands)
-        ecc_by_length = nx.eccentricity(eon, sp=dict(nx.all_pairs_dijkstra_path_length(eon, weight='length')))
-
-        data = {
-            '': id,
-            'mean_degree': meanDegree(eon, degrees=degrees),
-            'degree_variance': degreeVariance(eon, degrees=degrees),
-            'density': nx.density(eon),
-            'radius_by_hops': nx.radius(eon),
-            'diameter_by_hops': nx.diameter(eon),
-            'min_length': min(lengths),
-            'max_length': max(lengths),
-            'radius_by_length': nx.radius(eon, e=ecc_by_length),
-            'diameter_by_length': nx.diameter(eon, e=ecc_by_length),
-            'total_data_rate': demands_report['total_data_rate'], 
-            'blocking_coefficient': demands_report['blocking_coefficient']
-        }
-
-        return data
-    except:
+def getDistanceMatrices(eon, nodes=None):
+    # Hops and lengths of the shortest paths between every pair, in one Floyd-Warshall pass
+    if nodes is None:
+        nodes = list(eon.nodes())
+    node_index = {node: i for i, node in enumerate(nodes)}
+    distances = np.full((2, len(nodes), len(nodes)), np.inf)
+    for source, target, length in eon.edges(data='length'):
+        i, j = node_index[source], node_index[target]
+        distances[0, i, j] = distances[0, j, i] = 1
+        distances[1, i, j] = distances[1, j, i] = length
+    distances[:, range(len(nodes)), range(len(nodes))] = 0
+    hops, lengths = distances
+    adjacency = hops == 1
+    for k in range(len(nodes)):
+        np.minimum(distances, distances[:, :, k, None] + distances[:, None, k, :], out=distances)
+    return adjacency, hops, lengths
+
+def fragmentationData(eon):
+    # Spectrum state of the links left by the last simulation
+    rows = [index for _, _, index in eon.edges(data='index')]
+    metrics = eon.getFreeIntervals().getFragmentation()
+    free_slots = metrics['free_slots'][rows]
+    fragmentation = metrics['fragmentation'][rows]
+    return {
+        'spectrum_utilization': 1 - float(free_slots.sum()) / (len(rows) * eon.frequency_slots),
+        'mean_fragmentation': float(fragmentation.mean()),
+        'max_fragmentation': float(fragmentation.max()),
+        'mean_free_blocks': float(metrics['free_blocks'][rows].mean()),
+    }
+
+def survivabilityData(eon, demands, recompute_routes=True):
+    # Blocking under every single link failure, rerouting only the connections crossing the failed link
+    return Survivability.summarize(Survivability.evaluateFailures(eon, demands, recompute_routes=recompute_routes))
+
+def CSVdata(eon, demands, id=None, fragmentation=False, survivability=False):
+    # Disconnected or linkless topologies have no row
+    n_nodes = eon.number_of_nodes()
+    n_links = eon.number_of_edges()
+    if n_nodes == 0 or n_links == 0:
+        return None
+    adjacency, hops, lengths = getDistanceMatrices(eon)
+    if np.isinf(hops).any():
         return None
+    nodes_degree = adjacency.sum(axis=1).tolist()
+    ecc_by_hops = hops.max(axis=1)
+    ecc_by_length = lengths.max(axis=1)
+    links_length = [length for _, _, length in eon.edges(data='length')]
+    demands_report = fromDemands(demands)
+
+    data = {
+        '': id,
+        'mean_degree': mean(nodes_degree),
+        'degree_variance': variance(nodes_degree),
+        'density': n_links / (n_nodes * (n_nodes - 1)) * 2,
+        'radius_by_hops': int(ecc_by_hops.min()),
+        'diameter_by_hops': int(ecc_by_hops.max()),
+        'min_length': min(links_length),
+        'max_length': max(links_length),
+        'radius_by_length': float(ecc_by_length.min()),
+        'diameter_by_length': float(ecc_by_length.max()),
+        'total_data_rate': demands_report['total_data_rate'],
+        'blocking_coefficient': demands_report['blocking_coefficient']
+    }
+    if fragmentation:
+        data.update(fragmentationData(eon))
+    if survivability:
+        data.update(survivabilityData(eon, demands))
+
+    return data
 
 def fromDemands(demands):
+    if isinstance(demands, Demand.DemandSet):
+        return fromDemandSet(demands)
     total_data_rate = 0
     unexecuted = 0
     successes = 0
@@ -97,4 +152,20 @@ def fromDemands(demands):
         'unexecuted_rate': unexecuted / n_demands if n_demands > 0 else None,
         'success_rate': successes / n_demands  if n_demands > 0 else None,
         'blocking_coefficient': blocks / n_demands if n_demands > 0 else None,
-    }
\ No newline at end of file
+    }
+
+def fromDemandSet(demand_set):
+    n_demands = len(demand_set)
+    successes = demand_set.status == Demand.SUCCESS
+    n_successes = int(successes.sum())
+    unexecuted = int((demand_set.status == Demand.UNEXECUTED).sum())
+    blocks = n_demands - n_successes - unexecuted
+    return {
+        'total_data_rate': demand_set.data_rate[successes].sum(),
+        'unexecuted': unexecuted,
+        'successes': n_successes,
+        'blocks': blocks,
+        'unexecuted_rate': unexecuted / n_demands if n_demands > 0 else None,
+        'success_rate': n_successes / n_demands  if n_demands > 0 else None,
+        'blocking_coefficient': blocks / n_demands if n_demands > 0 else None,
+    }
@@ -0,0 +1,200 @@
+import src.Report as Report
+import numpy as np
+from glob import glob, escape
+from io import StringIO
+from time import monotonic
+import json
+import csv
+import os
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+class ResultsWriter():
+    # Buffered sink for result rows, owned by a single process (the collector of a pool)
+    def __init__(self, name, folder='', fieldnames=Report.index, formats=('csv',), buffer_size=4096, flush_interval=60):
+        self.name = name
+        self.folder = folder
+        self.path = folder + name
+        self.fieldnames = list(fieldnames)
+        self.formats = tuple(formats)
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self.rows = []
+        self.completed = []
+        self.last_flush = monotonic()
+
+        # Checking the results can be resumed before leaving anything next to them
+        checkpoint = loadCheckpoint(name, folder=folder)
+        if checkpoint is None and hasRows(self.path + '.csv'):
+            # Results written before checkpoints existed may number rows by surviving candidate
+            # instead of candidate id, appending to them would mix both
+            raise ValueError('%s.csv has no checkpoint and its ids may not be candidate ids, move it away or write under another name' % self.path)
+        if checkpoint is not None and checkpoint['fieldnames'] != self.fieldnames:
+            # Rows with other columns would not line up with the header already written
+            written = checkpoint['fieldnames']
+            raise ValueError('%s was written with %d columns, these results have %d (differing: %s), write them under another name'
+                             % (self.path, len(written), len(self.fieldnames), ', '.join(sorted(set(written) ^ set(self.fieldnames))) or 'order'))
+
+        # Refusing a second writer on the same results, workers must send rows to the owner
+        self.lock = open(self.path + '.lock', 'w')
+        if fcntl is not None:
+            try:
+                fcntl.flock(self.lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                self.lock.close()
+                raise RuntimeError('%s is already being written by another process' % self.path)
+
+        # Read again under the lock, a writer may have saved it since
+        self.checkpoint = loadCheckpoint(name, folder=folder)
+        if self.checkpoint is None:
+            self.checkpoint = self.createCheckpoint()
+        else:
+            self.rollback()
+
+    def createCheckpoint(self):
+        checkpoint = {'fieldnames': self.fieldnames, 'csv_size': 0, 'chunks': 0, 'ranges': []}
+        results_csv = self.path + '.csv'
+        # A CSV holding only a header is written again with these fieldnames
+        if 'csv' in self.formats:
+            with open(results_csv, 'w', newline='') as file:
+                writer = csv.DictWriter(file, fieldnames=self.fieldnames)
+                writer.writeheader()
+                checkpoint['csv_size'] = file.tell()
+        self.saveCheckpoint(checkpoint)
+        return checkpoint
+
+    def rollback(self):
+        # Dropping whatever was written after the last checkpoint, it will be simulated again
+        results_csv = self.path + '.csv'
+        if os.path.exists(results_csv) and os.path.getsize(results_csv) > self.checkpoint['csv_size']:
+            with open(results_csv, 'r+b') as file:
+                file.truncate(self.checkpoint['csv_size'])
+        for chunk in getChunkFiles(self.path)[self.checkpoint['chunks']:]:
+            os.remove(chunk)
+
+    def getMissingRanges(self, start=0, stop=None):
+        # Ranges of ids from start to stop (None for no end) not completed by any earlier run,
+        # as (first, stop) pairs, the last stop being None when stop is
+        missing = []
+        for first, last in self.checkpoint['ranges']:
+            if stop is not None and first >= stop:
+                break
+            if last >= start:
+                if first > start:
+                    missing.append((start, first))
+                start = last + 1
+        if stop is None or start < stop:
+            missing.append((start, stop))
+        return missing
+
+    def writeRows(self, rows, completed=None):
+        # completed is the (first, last) range of candidate ids whose rows, if any, are in rows or before
+        self.rows += rows
+        if completed is not None:
+            self.completed.append(list(completed))
+        if len(self.rows) >= self.buffer_size or monotonic() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        if self.rows:
+            if 'csv' in self.formats:
+                buffer = StringIO()
+                writer = csv.DictWriter(buffer, fieldnames=self.fieldnames)
+                writer.writerows(self.rows)
+                with open(self.path + '.csv', 'a', newline='') as file:
+                    file.write(buffer.getvalue())
+                    file.flush()
+                    os.fsync(file.fileno())
+                    self.checkpoint['csv_size'] = file.tell()
+                file.close()
+            if 'npy' in self.formats:
+                data = np.array([[row[field] for field in self.fieldnames] for row in self.rows], dtype=float)
+                chunk = '%s.%06d.npy' % (self.path, self.checkpoint['chunks'])
+                with open(chunk, 'wb') as file:
+                    np.save(file, data)
+                    file.flush()
+                    os.fsync(file.fileno())
+                file.close()
+                self.checkpoint['chunks'] += 1
+            self.rows = []
+        if self.completed:
+            self.checkpoint['ranges'] = mergeRanges(self.checkpoint['ranges'] + self.completed)
+            self.completed = []
+        self.saveCheckpoint(self.checkpoint)
+        self.last_flush = monotonic()
+
+    def saveCheckpoint(self, checkpoint):
+        # Replacing the file atomically, a crash leaves either the old or the new checkpoint
+        temporary = self.path + '.checkpoint.tmp'
+        with open(temporary, 'w') as file:
+            json.dump(checkpoint, file)
+            file.flush()
+            os.fsync(file.fileno())
+        file.close()
+        os.replace(temporary, self.path + '.checkpoint.json')
+
+    def close(self):
+        self.flush()
+        self.lock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def loadCheckpoint(name, folder=''):
+    try:
+        with open(folder + name + '.checkpoint.json', 'r') as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return None
+
+def hasRows(results_csv):
+    # Whether a CSV holds anything past its header line
+    try:
+        with open(results_csv, 'rb') as file:
+            file.readline()
+            return file.read(4096).strip() != b''
+    except FileNotFoundError:
+        return False
+
+def mergeRanges(ranges):
+    # Sorted inclusive id ranges, joining the ones that overlap or touch
+    merged = []
+    for first, last in sorted(ranges):
+        if merged and first <= merged[-1][1] + 1:
+            merged[-1][1] = max(merged[-1][1], last)
+        else:
+            merged.append([first, last])
+    return merged
+
+def getChunkFiles(path):
+    return sorted(glob(escape(path) + '.[0-9][0-9][0-9][0-9][0-9][0-9].npy'))
+
+def getResultNames(folder=''):
+    names = set()
+    for filename in glob(escape(folder) + '*.csv') + glob(escape(folder) + '*.checkpoint.json'):
+        names.add(os.path.basename(filename).rsplit('.checkpoint.json', 1)[0].rsplit('.csv', 1)[0])
+    return sorted(names)
+
+def iterateResults(name, folder='', chunksize=1 << 16):
+    # Yielding data frames chunk by chunk, from .npy chunks when there are any, else from the CSV
+    from pandas import DataFrame, read_csv
+    checkpoint = loadCheckpoint(name, folder=folder)
+    chunks = [] if checkpoint is None else getChunkFiles(folder + name)[:checkpoint['chunks']]
+    if chunks:
+        for chunk in chunks:
+            data = np.load(chunk, mmap_mode='r')
+            yield DataFrame(data[:, 1:], index=data[:, 0].astype(int), columns=checkpoint['fieldnames'][1:])
+    else:
+        for data in read_csv(folder + name + '.csv', index_col=0, chunksize=chunksize):
+            yield data
+
+def readResults(name, folder=''):
+    from pandas import DataFrame, concat
+    frames = list(iterateResults(name, folder=folder))
+    return concat(frames) if frames else DataFrame(columns=Report.index[1:])
@@ -0,0 +1,282 @@
+import src.Combinations as Combinations
+import src.Simulation as Simulation
+import src.Report as Report
+import src.Demand as Demand
+from src.EON import EON
+from concurrent.futures import ProcessPoolExecutor
+from time import monotonic
+from math import exp, inf
+import networkx as nx
+
+# Worker state, one topology kept in sync with the link sets being evaluated
+_base = None
+_modulation_levels = None
+_demands = None
+_links = None
+_eon = None
+_eon_links = None
+
+def initializeWorker(base, modulation_levels, demands, links):
+    global _base, _modulation_levels, _demands, _links, _eon, _eon_links
+    _base = base
+    _modulation_levels = modulation_levels
+    _demands = demands
+    _links = links
+    _eon = None
+    _eon_links = frozenset()
+
+def buildEON(base, links):
+    # Standalone copy of the base with the given links, routes are built on demand
+    eon = EON(frequency_slots=base.frequency_slots, name=base.name, k_paths=base.k_paths)
+    eon.add_nodes_from(base.nodes(data=True))
+    for source, target, length in base.edges(data='length'):
+        eon.addLink(source, target, length)
+    for source, target, length in links:
+        eon.addLink(source, target, length)
+    return eon
+
+def syncEON(link_set):
+    # Neighbouring link sets only differ by a few links, updated in place instead of rebuilt
+    global _eon, _eon_links
+    added = link_set - _eon_links
+    removed = _eon_links - link_set
+    if _eon is None or len(added) + len(removed) > max(4, len(link_set) // 4):
+        _eon = buildEON(_base, [_links[i] for i in sorted(link_set)])
+        _eon.compilePathPlans(_modulation_levels)
+    else:
+        # Adding first, so removals never disconnect the topology on the way
+        for i in sorted(added):
+            _eon.addLink(*_links[i], update_routes=False)
+        _eon.updateRoutes([_links[i][:2] for i in sorted(added)])
+        for i in sorted(removed):
+            _eon.removeLink(_links[i][0], _links[i][1])
+    _eon_links = link_set
+    return _eon
+
+def evaluateLinkSets(link_sets):
+    rows = []
+    for link_set in link_sets:
+        eon = syncEON(link_set)
+        eon.resetSpectrum()
+        Simulation.simulateDemandSet(eon, _modulation_levels, _demands)
+        rows.append(Report.CSVdata(eon, _demands))
+    return rows
+
+class TopologySearch():
+    # Optimizing the set of new links directly, minimizing the weighted sum of objectives:
+    # Report columns, total_length and n_links (negative weights maximize)
+    def __init__(self, eon, modulation_levels, demands, max_length=None, k_edge_connected=2,
+                 objectives={'blocking_coefficient': 1}, budget=1000, workers=1, random_state=None, verbose=False):
+        self.eon = eon
+        self.max_length = max_length
+        self.k_edge_connected = k_edge_connected
+        self.objectives = objectives
+        self.budget = budget
+        self.workers = workers
+        self.verbose = verbose
+        self.random = Demand.getRandomGenerator(random_state)
+
+        # Link sets are frozensets of indices of candidate links
+        self.links = Combinations.getCandidateLinks(eon, max_length)
+        self.link_ids = {}
+        for i, (source, target, _) in enumerate(self.links):
+            self.link_ids[source, target] = i
+            self.link_ids[target, source] = i
+        self.base_length = sum(length for _, _, length in eon.edges(data='length'))
+        self.candidate_filter = Combinations.CandidateFilter(eon, self.links, k_edge_connected or 1)
+        self.exact_check = Combinations.getExactCheck(k_edge_connected)
+
+        # Fitness and report row of every link set seen, by link set hash
+        self.cache = {}
+        self.evaluations = 0
+        self.best = None
+        self.best_fitness = inf
+        self.history = []
+        self.start_time = monotonic()
+
+        if not isinstance(demands, Demand.DemandSet):
+            demands = Demand.createDemandSet(demands, eon.nodes())
+        initargs = (eon, modulation_levels, demands, self.links)
+        if workers > 1:
+            self.executor = ProcessPoolExecutor(max_workers=workers, initializer=initializeWorker, initargs=initargs)
+        else:
+            self.executor = None
+            initializeWorker(*initargs)
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def getLinks(self, link_set):
+        return [self.links[i] for i in sorted(link_set)]
+
+    def isFeasible(self, link_set):
+        links = self.getLinks(link_set)
+        if not self.candidate_filter.accepts(links):
+            return False
+        if self.exact_check is not None:
+            G = nx.Graph(self.eon.edges())
+            G.add_edges_from((source, target) for source, target, _ in links)
+            return nx.is_k_edge_connected(G, self.exact_check)
+        return True
+
+    def getFitness(self, link_set, row):
+        if row is None:
+            return inf
+        values = dict(row)
+        values['total_length'] = self.base_length + sum(self.links[i][2] for i in link_set)
+        values['n_links'] = self.eon.number_of_edges() + len(link_set)
+        return sum(weight * values[name] for name, weight in self.objectives.items())
+
+    def evaluate(self, link_sets):
+        # Simulating only feasible link sets never seen before, within the budget
+        keys = [frozenset(link_set) for link_set in link_sets]
+        pending = []
+        for key in dict.fromkeys(keys):
+            if key in self.cache:
+                continue
+            if not self.isFeasible(key):
+                self.cache[key] = (inf, None)
+            elif self.evaluations + len(pending) < self.budget:
+                pending.append(key)
+        if pending:
+            for key, row in zip(pending, self.simulate(pending)):
+                fitness = self.getFitness(key, row)
+                self.cache[key] = (fitness, row)
+                self.evaluations += 1
+                if fitness < self.best_fitness:
+                    self.best = key
+                    self.best_fitness = fitness
+                    self.logBest()
+        return [self.cache[key][0] if key in self.cache else inf for key in keys]
+
+    def simulate(self, link_sets):
+        if self.executor is None:
+            return evaluateLinkSets(link_sets)
+        # Contiguous slices, so each worker moves between close link sets
+        size = -(-len(link_sets) // self.workers)
+        slices = [link_sets[i:i+size] for i in range(0, len(link_sets), size)]
+        rows = []
+        for result in self.executor.map(evaluateLinkSets, slices):
+            rows += result
+        return rows
+
+    def logBest(self):
+        entry = {
+            'evaluations': self.evaluations,
+            'time': monotonic() - self.start_time,
+            'fitness': self.best_fitness,
+            'n_links': len(self.best),
+        }
+        self.history.append(entry)
+        if self.verbose:
+            print('%(evaluations)d evaluations, %(time).1fs: best fitness %(fitness).6g with %(n_links)d new links' % entry)
+
+    def getInitialLinks(self, min_degree=3):
+        # Shortest links first, until every node has min_degree links and the topology is feasible,
+        # so most pairs already have their k paths and later moves only update routes around them
+        min_degree = max(min_degree, self.k_edge_connected or 1)
+        order = sorted(range(len(self.links)), key=lambda i: self.links[i][2])
+        link_set = set()
+        degree = dict(self.eon.degree())
+        for i in order:
+            source, target, _ = self.links[i]
+            if degree[source] < min_degree or degree[target] < min_degree:
+                link_set.add(i)
+                degree[source] += 1
+                degree[target] += 1
+        for i in order:
+            if self.isFeasible(link_set):
+                break
+            link_set.add(i)
+        return frozenset(link_set)
+
+    def getNeighbor(self, link_set):
+        # Adding, removing or swapping one link
+        inside = sorted(link_set)
+        outside = [i for i in range(len(self.links)) if i not in link_set]
+        move = self.random.random()
+        neighbor = set(link_set)
+        if inside and (move >= 1/3 or not outside):
+            neighbor.remove(inside[self.random.choice(len(inside))])
+        if outside and (move < 1/3 or move >= 2/3 or not inside):
+            neighbor.add(outside[self.random.choice(len(outside))])
+        return frozenset(neighbor)
+
+    def getStart(self, initial):
+        if initial is None:
+            return self.getInitialLinks()
+        return frozenset(self.link_ids[link[0], link[1]] for link in initial)
+
+    def localSearch(self, initial=None, neighborhood=16, patience=5):
+        # Greedy: moving to the best of some random neighbours while it improves
+        current = self.getStart(initial)
+        fitness = self.evaluate([current])[0]
+        stalled = 0
+        while self.evaluations < self.budget and stalled < patience:
+            neighbors = [self.getNeighbor(current) for _ in range(neighborhood)]
+            fitnesses = self.evaluate(neighbors)
+            i = min(range(len(neighbors)), key=fitnesses.__getitem__)
+            if fitnesses[i] < fitness:
+                current, fitness = neighbors[i], fitnesses[i]
+                stalled = 0
+            else:
+                stalled += 1
+        return self.getLinks(self.best) if self.best is not None else None, self.best_fitness
+
+    def simulatedAnnealing(self, initial=None, temperature=None, cooling=0.98, batch_size=None, patience=50):
+        # Neighbours are evaluated in batches, the first accepted by the Metropolis rule is taken
+        current = self.getStart(initial)
+        fitness = self.evaluate([current])[0]
+        if temperature is None:
+            temperature = 0.05 * abs(fitness) if 0 < abs(fitness) < inf else 1e-3
+        batch_size = batch_size or max(1, self.workers)
+        stalled = 0
+        while self.evaluations < self.budget and stalled < patience:
+            evaluations = self.evaluations
+            neighbors = [self.getNeighbor(current) for _ in range(batch_size)]
+            for neighbor, neighbor_fitness in zip(neighbors, self.evaluate(neighbors)):
+                if neighbor_fitness == inf:
+                    continue
+                if neighbor_fitness <= fitness or self.random.random() < exp((fitness - neighbor_fitness) / temperature):
+                    current, fitness = neighbor, neighbor_fitness
+                    break
+            temperature *= cooling
+            # Stopping when the neighbourhood has nothing new left to simulate
+            stalled = stalled + 1 if self.evaluations == evaluations else 0
+        return self.getLinks(self.best) if self.best is not None else None, self.best_fitness
+
+    def geneticAlgorithm(self, initial=None, population_size=16, mutation_rate=0.3, tournament_size=3, patience=10):
+        # Uniform crossover of link sets, mutation by one neighbour move, elitist replacement
+        first = self.getStart(initial)
+        population = [first] + [self.getNeighbor(first) for _ in range(population_size - 1)]
+        fitnesses = self.evaluate(population)
+        stalled = 0
+        while self.evaluations < self.budget and stalled < patience:
+            evaluations = self.evaluations
+            children = []
+            for _ in range(population_size):
+                a = self.select(population, fitnesses, tournament_size)
+                b = self.select(population, fitnesses, tournament_size)
+                different = sorted(a ^ b)
+                child = (a & b) | frozenset(i for i in different if self.random.random() < 0.5)
+                if self.random.random() < mutation_rate:
+                    child = self.getNeighbor(child)
+                children.append(child)
+            children_fitnesses = self.evaluate(children)
+            merged = dict(zip(population + children, fitnesses + children_fitnesses))
+            survivors = sorted(merged, key=lambda key: (merged[key], sorted(key)))[:population_size]
+            population = survivors
+            fitnesses = [merged[key] for key in survivors]
+            stalled = stalled + 1 if self.evaluations == evaluations else 0
+        return self.getLinks(self.best) if self.best is not None else None, self.best_fitness
+
+    def select(self, population, fitnesses, tournament_size):
+        picks = self.random.choice(len(population), size=min(tournament_size, len(population)), replace=False)
+        return population[min(picks, key=lambda i: fitnesses[i])]
@@ -0,0 +1,366 @@
+import src.Combinations as Combinations
+import src.Simulation as Simulation
+import src.Report as Report
+import src.Demand as Demand
+import src.Spectrum as Spectrum
+import src.TopologyCache as TopologyCache
+import src.ModulationLevel as ModulationLevel
+from src.EON import EON
+from concurrent.futures import ProcessPoolExecutor
+from collections import OrderedDict
+from hashlib import sha256
+from os import cpu_count
+import numpy as np
+import asyncio
+import socket
+import json
+import os
+
+# Local evaluation service: clients send jobs (a topology, links added to it, a demand seed and modulation
+# levels) as JSON lines over a Unix socket or a localhost port, and get Report.CSVdata rows back as they
+# are ready. Workers keep topologies and demand sets loaded between jobs, and every row is cached on disk
+# by a hash of everything it depends on, so jobs evaluated before are answered without simulating.
+#
+# Requests: {"type": "submit", "id": ..., "jobs": [...]}, {"type": "cancel", "id": ...}, {"type": "status"}
+# and {"type": "shutdown"}. A submission is answered by "accepted", then one "result" (or "error") per job
+# in completion order, then "done".
+
+# Bumped whenever simulations change, so old cached rows are not returned
+version = 1
+
+# Worker state, topologies by key and the last demand sets drawn from them
+_topology_cache = None
+_topologies = OrderedDict()
+_demand_sets = OrderedDict()
+_max_topologies = 8
+
+def initializeWorker(topology_cache=None):
+    global _topology_cache
+    _topology_cache = topology_cache
+
+def remember(cache, key, value, size):
+    cache[key] = value
+    cache.move_to_end(key)
+    while len(cache) > size:
+        cache.popitem(last=False)
+
+def getTopology(job):
+    key = job['topology_key']
+    if key in _topologies:
+        _topologies.move_to_end(key)
+        return _topologies[key]
+    eon = EON(frequency_slots=job['frequency_slots'], name='EON', k_paths=job['k_paths'])
+    eon.loadCSV(job['nodes_csv'], job['links_csv'], cache_folder=_topology_cache)
+    modulation_levels = ModulationLevel.loadModulationLevels(job['modulation_levels'])
+    eon.compilePathPlans(modulation_levels)
+    remember(_topologies, key, (eon, modulation_levels), _max_topologies)
+    return eon, modulation_levels
+
+def getDemandSet(job, eon):
+    key = (job['topology_key'], job['random_state'])
+    if key not in _demand_sets:
+        remember(_demand_sets, key, Demand.createRandomDemandSet(eon, random_state=job['random_state']), 4*_max_topologies)
+    demand_set = _demand_sets[key]
+    # Results are written to the columns, every job gets its own
+    return Demand.DemandSet(demand_set.nodes, demand_set.source, demand_set.target, demand_set.data_rate)
+
+def createEON(job, eon):
+    for link in job['links']:
+        if link[0] not in eon or link[1] not in eon:
+            raise ValueError('Link %s-%s has a node not in the topology' % (link[0], link[1]))
+    possible_eon = Combinations.createPossibleEON(eon, job['links'])
+    possible_eon.setSpectrumPolicy(job['spectrum_policy'], random_state=job['random_state'])
+    return possible_eon
+
+def evaluateJobs(batch):
+    # Jobs of a batch share topology and demand seed, first fit ones are simulated together
+    results = []
+    simulated = []
+    for position, job in batch:
+        try:
+            eon, modulation_levels = getTopology(job)
+            simulated.append((position, job, createEON(job, eon), getDemandSet(job, eon)))
+        except Exception as error:
+            results.append((position, None, '%s: %s' % (type(error).__name__, error)))
+    if not simulated:
+        return results
+    eon, modulation_levels = getTopology(simulated[0][1])
+    together = [item for item in simulated if item[1]['spectrum_policy'] == 'first_fit']
+    if len(together) > 1:
+        update_spectrum = any(job['fragmentation'] for _, job, _, _ in together)
+        demand_sets = Simulation.simulateBatch([possible_eon for _, _, possible_eon, _ in together], modulation_levels,
+                                               together[0][3], update_spectrum=update_spectrum)
+        simulated = [item for item in simulated if item[1]['spectrum_policy'] != 'first_fit']
+        for (position, job, possible_eon, _), demand_set in zip(together, demand_sets):
+            results.append((position, getRow(job, possible_eon, demand_set), None))
+    for position, job, possible_eon, demand_set in simulated:
+        Simulation.simulateDemandSet(possible_eon, modulation_levels, demand_set)
+        results.append((position, getRow(job, possible_eon, demand_set), None))
+    return results
+
+def getRow(job, eon, demand_set):
+    return Report.CSVdata(eon, demand_set, id=job['id'], fragmentation=job['fragmentation'], survivability=job['survivability'])
+
+def toJSON(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError('%s is not JSON serializable' % type(value).__name__)
+
+def encode(message):
+    return (json.dumps(message, default=toJSON) + '\n').encode()
+
+class ResultCache():
+    # One JSON file per row, under the first two characters of its key
+    def __init__(self, folder):
+        self.folder = folder
+
+    def getPath(self, key):
+        return os.path.join(self.folder, key[:2], key + '.json')
+
+    def get(self, key):
+        # (True, row) if cached, rows of disconnected topologies are None
+        try:
+            with open(self.getPath(key), 'r') as file:
+                return True, json.load(file)['row']
+        except (FileNotFoundError, ValueError):
+            return False, None
+
+    def save(self, key, row):
+        path = self.getPath(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary = '%s.%d.tmp' % (path, os.getpid())
+        with open(temporary, 'w') as file:
+            json.dump({'version': version, 'row': row}, file, default=toJSON)
+        os.replace(temporary, path)
+
+class JobService():
+    def __init__(self, cache_folder='results/service/', topology_cache=None, workers=None, batch_size=16):
+        if workers is None:
+            workers = cpu_count()
+        self.cache = ResultCache(cache_folder)
+        self.batch_size = batch_size
+        self.executor = ProcessPoolExecutor(max_workers=workers, initializer=initializeWorker, initargs=(topology_cache,))
+        self.workers = workers
+        self.submissions = {}
+        self.file_keys = {}
+        self.counters = {'jobs': 0, 'cached': 0, 'evaluated': 0, 'errors': 0, 'cancelled': 0}
+        self.next_id = 0
+        self.server = None
+
+    def close(self):
+        self.executor.shutdown(cancel_futures=True)
+
+    def getFileKey(self, *key):
+        # Hashing file contents once per version of the files
+        paths = [path for path in key if isinstance(path, str)]
+        stamp = key + tuple(os.stat(path).st_mtime_ns for path in paths)
+        if stamp not in self.file_keys:
+            nodes_csv, links_csv, k_paths, frequency_slots = key
+            self.file_keys[stamp] = TopologyCache.getCacheKey(nodes_csv, links_csv, k_paths, frequency_slots)
+        return self.file_keys[stamp]
+
+    def normalizeJob(self, job):
+        # Canonical job, links sorted with their nodes in order so equal link sets get the same key
+        # and are built the same way
+        policy = job.get('spectrum_policy', 'first_fit')
+        if policy not in Spectrum.policies:
+            raise ValueError('Unknown spectrum policy %s' % policy)
+        links = {}
+        for link in job.get('links', []):
+            source, target = sorted(link[:2], key=lambda node: json.dumps(node))
+            length = float(link[2]) if len(link) > 2 and link[2] is not None else None
+            if links.get((json.dumps(source), json.dumps(target)), (None, None, length))[2] != length:
+                raise ValueError('Link %s-%s is given twice with different lengths' % (source, target))
+            links[json.dumps(source), json.dumps(target)] = (source, target, length)
+        normalized = {
+            'nodes_csv': os.path.abspath(job['nodes_csv']),
+            'links_csv': os.path.abspath(job['links_csv']) if job.get('links_csv') else None,
+            'modulation_levels': os.path.abspath(job.get('modulation_levels', 'input/modulation_levels.csv')),
+            'k_paths': int(job.get('k_paths', 3)),
+            'frequency_slots': int(job.get('frequency_slots', 320)),
+            'links': [links[key] for key in sorted(links)],
+            'random_state': int(job.get('random_state', 0)),
+            'spectrum_policy': policy,
+            'fragmentation': bool(job.get('fragmentation', False)),
+            'survivability': bool(job.get('survivability', False)),
+            'id': job.get('id'),
+        }
+        normalized['topology_key'] = self.getFileKey(normalized['nodes_csv'], normalized['links_csv'], normalized['k_paths'], normalized['frequency_slots'])
+        levels_key = self.getFileKey(normalized['modulation_levels'], None, 0, 0)
+        normalized['topology_key'] += levels_key
+        # Everything the row depends on, the id only labels it
+        hashed = {name: value for name, value in normalized.items() if name not in ('nodes_csv', 'links_csv', 'modulation_levels', 'id')}
+        hashed['version'] = version
+        key = sha256(json.dumps(hashed, sort_keys=True).encode()).hexdigest()
+        return key, normalized
+
+    def getBatches(self, pending):
+        # Grouping jobs by topology and demand seed, batch_size jobs at most per task
+        groups = {}
+        for position, job in pending:
+            groups.setdefault((job['topology_key'], job['random_state']), []).append((position, job))
+        for group in groups.values():
+            for i in range(0, len(group), self.batch_size):
+                yield group[i:i + self.batch_size]
+
+    async def runSubmission(self, id, jobs, send):
+        loop = asyncio.get_running_loop()
+        keys = [None]*len(jobs)
+        pending = []
+        futures = []
+        try:
+            await self.runJobs(id, jobs, send, loop, keys, pending, futures)
+        except asyncio.CancelledError:
+            # Tasks already running finish in their worker and are not cached, queued ones never start
+            for future in futures:
+                future.cancel()
+            self.counters['cancelled'] += 1
+            try:
+                await send({'type': 'done', 'id': id, 'jobs': len(jobs), 'cancelled': True})
+            except (ConnectionError, OSError):
+                # Cancelled because the client left, there is nobody to tell
+                pass
+        except (ConnectionError, OSError):
+            # The client left while results were sent, the rest would not be read
+            for future in futures:
+                future.cancel()
+        finally:
+            self.submissions.pop(id, None)
+
+    async def runJobs(self, id, jobs, send, loop, keys, pending, futures):
+        cached = 0
+        errors = 0
+        ids = [job.get('id') if isinstance(job, dict) else None for job in jobs]
+        for position, job in enumerate(jobs):
+            try:
+                keys[position], normalized = self.normalizeJob(job)
+            except Exception as error:
+                errors += 1
+                self.counters['errors'] += 1
+                await send({'type': 'error', 'id': id, 'index': position, 'error': '%s: %s' % (type(error).__name__, error)})
+                continue
+            found, row = self.cache.get(keys[position])
+            if found:
+                cached += 1
+                # Cached rows were labelled by the job that computed them
+                if row is not None:
+                    row[''] = normalized['id']
+                await send({'type': 'result', 'id': id, 'index': position, 'key': keys[position], 'cached': True, 'row': row})
+            else:
+                pending.append((position, normalized))
+        self.counters['jobs'] += len(jobs)
+        self.counters['cached'] += cached
+        # Equal jobs in one submission are simulated once
+        first = {}
+        duplicates = {}
+        for position, job in pending:
+            if keys[position] in first:
+                duplicates.setdefault(first[keys[position]], []).append(position)
+            else:
+                first[keys[position]] = position
+        pending[:] = [(position, job) for position, job in pending if first[keys[position]] == position]
+        futures += [loop.run_in_executor(self.executor, evaluateJobs, batch) for batch in self.getBatches(pending)]
+        for future in asyncio.as_completed(futures):
+            for position, row, error in await future:
+                if error is None:
+                    self.cache.save(keys[position], row)
+                    self.counters['evaluated'] += 1
+                for index in [position] + duplicates.get(position, []):
+                    if error is not None:
+                        errors += 1
+                        self.counters['errors'] += 1
+                        await send({'type': 'error', 'id': id, 'index': index, 'error': error})
+                    else:
+                        # Equal jobs only differ by their id
+                        if row is not None and index != position:
+                            row = dict(row, **{'': ids[index]})
+                        await send({'type': 'result', 'id': id, 'index': index, 'key': keys[index], 'cached': False, 'row': row})
+        await send({'type': 'done', 'id': id, 'jobs': len(jobs), 'cached': cached, 'errors': errors, 'cancelled': False})
+
+    async def handleClient(self, reader, writer):
+        lock = asyncio.Lock()
+        async def send(message):
+            async with lock:
+                writer.write(encode(message))
+                await writer.drain()
+        tasks = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    message = json.loads(line)
+                    kind = message['type']
+                except (ValueError, KeyError, TypeError):
+                    await send({'type': 'error', 'error': 'Expected a JSON object with a type'})
+                    continue
+                if kind == 'submit':
+                    id = message.get('id')
+                    if id is None or id in self.submissions:
+                        id = 'job-%d' % self.next_id
+                        self.next_id += 1
+                    jobs = message.get('jobs', [])
+                    await send({'type': 'accepted', 'id': id, 'jobs': len(jobs)})
+                    task = asyncio.create_task(self.runSubmission(id, jobs, send))
+                    self.submissions[id] = task
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+                elif kind == 'cancel':
+                    task = self.submissions.get(message.get('id'))
+                    if task is not None:
+                        task.cancel()
+                        await send({'type': 'cancelled', 'id': message.get('id')})
+                    else:
+                        await send({'type': 'error', 'id': message.get('id'), 'error': 'No running submission with this id'})
+                elif kind == 'status':
+                    await send({'type': 'status', 'workers': self.workers, 'running': list(self.submissions), **self.counters})
+                elif kind == 'shutdown':
+                    await send({'type': 'shutdown'})
+                    self.server.close()
+                    break
+                else:
+                    await send({'type': 'error', 'error': 'Unknown request type %s' % kind})
+            # Submissions of a client that left are cancelled, results it will not read are not computed
+            for task in tasks:
+                task.cancel()
+            if tasks:
+                await asyncio.wait(tasks)
+        except ConnectionError:
+            for task in tasks:
+                task.cancel()
+        finally:
+            writer.close()
+
+    async def serve(self, path=None, host='127.0.0.1', port=None):
+        # Unix socket at path, or localhost TCP port when port is given
+        if port is not None:
+            self.server = await asyncio.start_server(self.handleClient, host, port, limit=1 << 26)
+        else:
+            if os.path.exists(path):
+                os.remove(path)
+            self.server = await asyncio.start_unix_server(self.handleClient, path, limit=1 << 26)
+        try:
+            async with self.server:
+                await self.server.wait_closed()
+        finally:
+            if port is None and os.path.exists(path):
+                os.remove(path)
+
+def connect(path=None, host='127.0.0.1', port=None):
+    if port is not None:
+        return socket.create_connection((host, port))
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    client.connect(path)
+    return client
+
+def request(message, path=None, host='127.0.0.1', port=None):
+    # Sending one request and yielding the messages answering it, up to "done" for a submission
+    with connect(path, host, port) as client:
+        client.sendall(encode(message))
+        file = client.makefile('r')
+        for line in file:
+            answer = json.loads(line)
+            yield answer
+            if answer['type'] in ('done', 'cancelled', 'status', 'shutdown') or (answer['type'] == 'error' and 'index' not in answer):
+                break
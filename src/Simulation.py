@@ -1,5 +1,5 @@
-import networkx as nx
-from itertools import combinations
+import numpy as np
+import src.Demand as Demand
 from math import ceil
 
 def route(eon, demand, k=0):
@@ -15,15 +15,17 @@ def route(eon, demand, k=0):
     path_length = eon.shortest_path_length[demand.source][demand.target][k]
     # Creating links path
     links_path = []
+    links_index = []
     for i in range(len(nodes_path)-1):
         link = (nodes_path[i], nodes_path[i+1])
-        if link not in eon.edges():
-            link = (link[1], link[0])
-            if link not in eon.edges():
-                demand.status = False
-                return
+        index = eon.link_index.get(link)
+        if index is None:
+            demand.status = False
+            return
         links_path.append(link)
+        links_index.append(index)
     demand.links_path = links_path
+    demand.links_index = links_index
     demand.path_length = path_length
 
 def allocModulationLevel(eon, demand, modulation_levels):
@@ -43,36 +45,41 @@ def allocSpectrum(eon, demand):
     if demand.status is not None:
         return
     demand.frequency_slots = ceil(demand.data_rate / demand.modulation_level.data_rate)
-    for i in range(eon.frequency_slots):
-        if demand.spectrum_begin is not None and i-demand.spectrum_begin == demand.frequency_slots:
-            break
-        available = True
-        for link in demand.links_path:
-            if eon.edges[link[0], link[1]]['spectrum'][i] is not None:
-                available = False
-        if available:
-            if demand.spectrum_begin is None:
-                demand.spectrum_begin = i
-        else:
-            demand.spectrum_begin = None
-    if i-demand.spectrum_begin == demand.frequency_slots:
-        demand.status = True
-    else:
-        demand.spectrum_begin = None
-        demand.status = False
+    demand.spectrum_begin = eon.assignSpectrum(demand.links_index, demand.frequency_slots)
+    demand.status = demand.spectrum_begin is not None
 
 def RMLSA(eon, modulation_levels, demand):
+    # Compiling path plans if necessary
+    if eon.path_plans is None or eon.plan_modulation_levels is not modulation_levels:
+        eon.compilePathPlans(modulation_levels)
+    plans = eon.path_plans[demand.source][demand.target]
     for k in range(eon.k_paths):
         demand.reset()
-        route(eon, demand, k=k)
-        allocModulationLevel(eon, demand, modulation_levels)
-        allocSpectrum(eon, demand)
+        # Blocking demand if there are no more routes
+        if k >= len(plans):
+            demand.status = False
+            break
+        plan = plans[k]
+        demand.links_path = plan.links_path
+        demand.links_index = plan.links_index
+        demand.path_length = plan.path_length
+        demand.modulation_level = plan.modulation_level
+        if plan.modulation_level is None:
+            demand.status = False
+            continue
+        demand.frequency_slots = plan.getFrequencySlots(demand.data_rate)
+        demand.spectrum_begin = eon.assignSpectrum(plan.links_index, demand.frequency_slots)
+        demand.status = demand.spectrum_begin is not None
+        if demand.status is True:
+            break
 
 def executeDemand(eon, demand):
     if demand.status is True:
-        for i in range(demand.spectrum_begin, demand.spectrum_begin + demand.frequency_slots):
-            for link in demand.links_path:
-                eon.edges[link[0], link[1]]['spectrum'][i] = demand.modulation_level.data_rate
+        eon.allocateSpectrum(demand.links_index, demand.spectrum_begin, demand.frequency_slots, demand.modulation_level.data_rate)
+
+def releaseDemand(eon, demand):
+    if demand.status is True:
+        eon.releaseSpectrum(demand.links_index, demand.spectrum_begin, demand.frequency_slots)
 
 def simulateDemand(eon, modulation_levels, demand):
     RMLSA(eon, modulation_levels, demand)
@@ -80,4 +87,119 @@ def simulateDemand(eon, modulation_levels, demand):
 
 def simulateDemands(eon, modulation_levels, demands):
     for demand in demands:
-        simulateDemand(eon, modulation_levels, demand)
\ No newline at end of file
+        simulateDemand(eon, modulation_levels, demand)
+
+def simulateDemandSet(eon, modulation_levels, demand_set, start=0, stop=None):
+    # Running RMLSA over the columns without creating Demand objects, only demands from start to stop
+    # are simulated, on the spectrum left by the ones before them
+    if eon.path_plans is None or eon.plan_modulation_levels is not modulation_levels:
+        eon.compilePathPlans(modulation_levels)
+    if stop is None:
+        stop = len(demand_set)
+    level_index = {id(ml): i for i, ml in enumerate(modulation_levels)}
+    nodes = demand_set.nodes
+    n_demands = stop - start
+    chosen_k = [-1]*n_demands
+    modulation_level = [-1]*n_demands
+    frequency_slots = [0]*n_demands
+    spectrum_begin = [-1]*n_demands
+    status = [Demand.BLOCKED]*n_demands
+    data_rates = demand_set.data_rate[start:stop].tolist()
+    for i, (source, target) in enumerate(zip(demand_set.source[start:stop].tolist(), demand_set.target[start:stop].tolist())):
+        plans = eon.path_plans[nodes[source]][nodes[target]]
+        for k, plan in enumerate(plans[:eon.k_paths]):
+            if plan.modulation_level is None:
+                continue
+            slots = plan.getFrequencySlots(data_rates[i])
+            begin = eon.assignSpectrum(plan.links_index, slots)
+            if begin is not None:
+                eon.allocateSpectrum(plan.links_index, begin, slots, plan.modulation_level.data_rate)
+                chosen_k[i] = k
+                modulation_level[i] = level_index[id(plan.modulation_level)]
+                frequency_slots[i] = slots
+                spectrum_begin[i] = begin
+                status[i] = Demand.SUCCESS
+                break
+    demand_set.k[start:stop] = chosen_k
+    demand_set.modulation_level[start:stop] = modulation_level
+    demand_set.frequency_slots[start:stop] = frequency_slots
+    demand_set.spectrum_begin[start:stop] = spectrum_begin
+    demand_set.status[start:stop] = status
+
+def simulateBatch(eons, modulation_levels, demand_set, update_spectrum=True):
+    # Simulating topologies sharing nodes and demand order on a (topologies x links x slots)
+    # occupancy tensor, one pass over the demands for the whole batch
+    frequency_slots = eons[0].frequency_slots
+    k_paths = eons[0].k_paths
+    if any(eon.frequency_slots != frequency_slots or eon.k_paths != k_paths for eon in eons):
+        raise ValueError('EONs in a batch must have the same frequency slots and k paths')
+    if any(eon.spectrum_policy != 'first_fit' for eon in eons):
+        raise ValueError('EONs in a batch can only be simulated with first fit')
+    for eon in eons:
+        if eon.path_plans is None or eon.plan_modulation_levels is not modulation_levels:
+            eon.compilePathPlans(modulation_levels)
+    level_index = {id(ml): i for i, ml in enumerate(modulation_levels)}
+    n_eons = len(eons)
+    n_demands = len(demand_set)
+    # The last link row is padding for shorter paths and is always free
+    padding = max(len(eon.spectrum) for eon in eons)
+    occupancy = np.zeros((n_eons, padding + 1, frequency_slots), dtype=bool)
+    slots_range = np.arange(frequency_slots)
+    chosen_k = np.full((n_eons, n_demands), -1, dtype=np.intp)
+    modulation_level = np.full((n_eons, n_demands), -1, dtype=np.intp)
+    slots_used = np.zeros((n_eons, n_demands), dtype=np.intp)
+    spectrum_begin = np.full((n_eons, n_demands), -1, dtype=np.intp)
+    nodes = demand_set.nodes
+    data_rates = demand_set.data_rate.tolist()
+    for i, (source, target) in enumerate(zip(demand_set.source.tolist(), demand_set.target.tolist())):
+        all_plans = [eon.path_plans[nodes[source]][nodes[target]] for eon in eons]
+        pending = range(n_eons)
+        for k in range(k_paths):
+            # Gathering the k-th plan of every pending topology
+            batch = [b for b in pending if k < len(all_plans[b]) and all_plans[b][k].modulation_level is not None]
+            if not batch:
+                continue
+            plans = [all_plans[b][k] for b in batch]
+            hops = max(len(plan.links_index) for plan in plans)
+            links = np.full((len(batch), hops), padding, dtype=np.intp)
+            for j, plan in enumerate(plans):
+                links[j, :len(plan.links_index)] = plan.links_index
+            slots = np.array([plan.getFrequencySlots(data_rates[i]) for plan in plans])
+            batch = np.array(batch)
+            # First-fit for the whole batch at once, from the free run ending at each slot
+            occupied = occupancy[batch[:, None], links].any(axis=1)
+            last_occupied = np.maximum.accumulate(np.where(occupied, slots_range, -1), axis=1)
+            fits = slots_range - last_occupied >= slots[:, None]
+            found = fits.any(axis=1)
+            if not found.any():
+                continue
+            # Allocating spectrum of successful topologies
+            allocated = np.flatnonzero(found)
+            begin = fits[allocated].argmax(axis=1) - slots[allocated] + 1
+            mask = (slots_range[None, :] >= begin[:, None]) & (slots_range[None, :] < (begin + slots[allocated])[:, None])
+            occupancy[batch[allocated, None], links[allocated]] |= mask[:, None, :]
+            occupancy[:, padding] = False
+            allocated_eons = batch[allocated]
+            chosen_k[allocated_eons, i] = k
+            modulation_level[allocated_eons, i] = [level_index[id(plans[j].modulation_level)] for j in allocated]
+            slots_used[allocated_eons, i] = slots[allocated]
+            spectrum_begin[allocated_eons, i] = begin
+            pending = batch[~found].tolist()
+            if not pending:
+                break
+    # Creating one demand set per topology and leaving it with its final spectrum
+    results = []
+    for b, eon in enumerate(eons):
+        result = Demand.DemandSet(nodes, demand_set.source, demand_set.target, demand_set.data_rate)
+        result.k = chosen_k[b]
+        result.modulation_level = modulation_level[b]
+        result.frequency_slots = slots_used[b]
+        result.spectrum_begin = spectrum_begin[b]
+        result.status = np.where(chosen_k[b] >= 0, Demand.SUCCESS, Demand.BLOCKED).astype(np.int8)
+        if update_spectrum:
+            eon.resetSpectrum()
+            for i in np.flatnonzero(result.status == Demand.SUCCESS):
+                plan = eon.path_plans[nodes[demand_set.source[i]]][nodes[demand_set.target[i]]][result.k[i]]
+                eon.allocateSpectrum(plan.links_index, result.spectrum_begin[i], result.frequency_slots[i], plan.modulation_level.data_rate)
+        results.append(result)
+    return results
@@ -0,0 +1,214 @@
+import numpy as np
+from bisect import bisect_right
+
+def getRowIntervals(row):
+    # Runs of free slots of a spectrum row, as begins and ends (exclusive)
+    free = np.concatenate(([False], row == 0, [False]))
+    edges = np.flatnonzero(free[1:] != free[:-1])
+    return edges[0::2].tolist(), edges[1::2].tolist()
+
+def getIndexList(links_index):
+    # Plain ints index Python lists faster than NumPy ones
+    return links_index.tolist() if isinstance(links_index, np.ndarray) else links_index
+
+def intersect(begins, ends, other_begins, other_ends, frequency_slots):
+    new_begins = []
+    new_ends = []
+    i = j = 0
+    n = len(begins)
+    m = len(other_begins)
+    while i < n and j < m:
+        begin = begins[i] if begins[i] > other_begins[j] else other_begins[j]
+        if ends[i] < other_ends[j]:
+            end = ends[i]
+            i += 1
+        else:
+            end = other_ends[j]
+            j += 1
+        if end - begin >= frequency_slots:
+            new_begins.append(begin)
+            new_ends.append(end)
+    return new_begins, new_ends
+
+class FreeIntervals():
+    # Free slots of every spectrum row as sorted, disjoint [begin, end) intervals, kept in step with
+    # allocations and releases, so finding a block on a path does not scan every slot of its links
+    def __init__(self, spectrum):
+        self.frequency_slots = spectrum.shape[1]
+        self.begins = []
+        self.ends = []
+        for row in spectrum:
+            begins, ends = getRowIntervals(row)
+            self.begins.append(begins)
+            self.ends.append(ends)
+
+    def reset(self, n_rows):
+        self.begins = [[0] for _ in range(n_rows)]
+        self.ends = [[self.frequency_slots] for _ in range(n_rows)]
+
+    def resetRow(self, index):
+        while len(self.begins) <= index:
+            self.begins.append([0])
+            self.ends.append([self.frequency_slots])
+        self.begins[index] = [0]
+        self.ends[index] = [self.frequency_slots]
+
+    def rebuildRow(self, index, row):
+        self.begins[index], self.ends[index] = getRowIntervals(row)
+
+    def allocate(self, spectrum, links_index, spectrum_begin, frequency_slots):
+        end = spectrum_begin + frequency_slots
+        for index in getIndexList(links_index):
+            begins = self.begins[index]
+            ends = self.ends[index]
+            i = bisect_right(begins, spectrum_begin) - 1
+            if i < 0 or ends[i] < end:
+                # Slots that were not all free, only the matrix knows what is left
+                self.rebuildRow(index, spectrum[index])
+                continue
+            interval_begin = begins[i]
+            interval_end = ends[i]
+            if interval_begin < spectrum_begin and end < interval_end:
+                ends[i] = spectrum_begin
+                begins.insert(i + 1, end)
+                ends.insert(i + 1, interval_end)
+            elif interval_begin < spectrum_begin:
+                ends[i] = spectrum_begin
+            elif end < interval_end:
+                begins[i] = end
+            else:
+                del begins[i]
+                del ends[i]
+
+    def release(self, spectrum, links_index, spectrum_begin, frequency_slots):
+        end = spectrum_begin + frequency_slots
+        for index in getIndexList(links_index):
+            begins = self.begins[index]
+            ends = self.ends[index]
+            i = bisect_right(begins, spectrum_begin)
+            if (i > 0 and ends[i - 1] > spectrum_begin) or (i < len(begins) and begins[i] < end):
+                # Slots that were partly free already
+                self.rebuildRow(index, spectrum[index])
+                continue
+            merge_left = i > 0 and ends[i - 1] == spectrum_begin
+            merge_right = i < len(begins) and begins[i] == end
+            if merge_left and merge_right:
+                ends[i - 1] = ends[i]
+                del begins[i]
+                del ends[i]
+            elif merge_left:
+                ends[i - 1] = end
+            elif merge_right:
+                begins[i] = spectrum_begin
+            else:
+                begins.insert(i, spectrum_begin)
+                ends.insert(i, end)
+
+    def getFirstBlock(self, links_index, frequency_slots):
+        # First fit without intersecting whole lists: moving a candidate slot forward to the next
+        # block of every link that holds frequency_slots from it, until all links agree
+        links_index = getIndexList(links_index)
+        candidate = 0
+        agreed = 0
+        i = 0
+        while agreed < len(links_index):
+            begins = self.begins[links_index[i]]
+            ends = self.ends[links_index[i]]
+            j = bisect_right(begins, candidate) - 1
+            if j < 0 or ends[j] - candidate < frequency_slots:
+                # Next block of the link long enough, every other link has to be checked again
+                j += 1
+                while j < len(begins) and ends[j] - begins[j] < frequency_slots:
+                    j += 1
+                if j == len(begins):
+                    return None
+                candidate = begins[j]
+                agreed = 0
+            agreed += 1
+            i = (i + 1) % len(links_index)
+        return candidate
+
+    def getPathBlocks(self, links_index, frequency_slots=1):
+        # Intersecting the free intervals of every link, dropping blocks shorter than frequency_slots
+        # as soon as they appear, since intersections only make them shorter
+        links_index = getIndexList(links_index)
+        begins = self.begins[links_index[0]]
+        ends = self.ends[links_index[0]]
+        if len(links_index) == 1:
+            return intersect(begins, ends, [0], [self.frequency_slots], frequency_slots)
+        for index in links_index[1:]:
+            if not begins:
+                break
+            begins, ends = intersect(begins, ends, self.begins[index], self.ends[index], frequency_slots)
+        return begins, ends
+
+    def getFragmentation(self):
+        # Per row: free slots, free blocks, largest free block and external fragmentation,
+        # the share of free slots outside the largest block
+        n_rows = len(self.begins)
+        free_slots = np.zeros(n_rows, dtype=np.intp)
+        free_blocks = np.zeros(n_rows, dtype=np.intp)
+        largest_block = np.zeros(n_rows, dtype=np.intp)
+        for index, (begins, ends) in enumerate(zip(self.begins, self.ends)):
+            sizes = [end - begin for begin, end in zip(begins, ends)]
+            free_slots[index] = sum(sizes)
+            free_blocks[index] = len(sizes)
+            largest_block[index] = max(sizes, default=0)
+        with np.errstate(all='ignore'):
+            fragmentation = np.where(free_slots > 0, 1 - largest_block / free_slots, 0)
+        return {
+            'free_slots': free_slots,
+            'free_blocks': free_blocks,
+            'largest_block': largest_block,
+            'fragmentation': fragmentation,
+        }
+
+# Spectrum assignment policies, choosing the first slot of frequency_slots free on every link
+# of the path, None if there are none
+
+def firstFit(free_intervals, links_index, frequency_slots, random):
+    return free_intervals.getFirstBlock(links_index, frequency_slots)
+
+def lastFit(free_intervals, links_index, frequency_slots, random):
+    begins, ends = free_intervals.getPathBlocks(links_index, frequency_slots)
+    if not begins:
+        return None
+    return ends[-1] - frequency_slots
+
+def bestFit(free_intervals, links_index, frequency_slots, random):
+    # Smallest block, the first one on ties
+    begins, ends = free_intervals.getPathBlocks(links_index, frequency_slots)
+    if not begins:
+        return None
+    i = min(range(len(begins)), key=lambda i: ends[i] - begins[i])
+    return begins[i]
+
+def exactFit(free_intervals, links_index, frequency_slots, random):
+    # First block of the exact size, else first fit
+    begins, ends = free_intervals.getPathBlocks(links_index, frequency_slots)
+    if not begins:
+        return None
+    for begin, end in zip(begins, ends):
+        if end - begin == frequency_slots:
+            return begin
+    return begins[0]
+
+def randomFit(free_intervals, links_index, frequency_slots, random):
+    # Uniform among every slot a block can begin at
+    begins, ends = free_intervals.getPathBlocks(links_index, frequency_slots)
+    if not begins:
+        return None
+    positions = [end - begin - frequency_slots + 1 for begin, end in zip(begins, ends)]
+    position = int(random.random() * sum(positions))
+    for begin, count in zip(begins, positions):
+        if position < count:
+            return begin + position
+        position -= count
+
+policies = {
+    'first_fit': firstFit,
+    'last_fit': lastFit,
+    'best_fit': bestFit,
+    'exact_fit': exactFit,
+    'random_fit': randomFit,
+}
@@ -0,0 +1,173 @@
+import src.Report as Report
+import src.Results as Results
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from os import cpu_count
+import warnings
+
+class StreamingStatistics():
+    # Online statistics of a table read chunk by chunk, memory only depends on the number of columns
+    def __init__(self, columns, bins=None):
+        self.columns = list(columns)
+        p = len(self.columns)
+        # Pairwise complete observations, as pandas does: entry [i, j] only counts rows where i and j are both set
+        self.n = np.zeros((p, p))
+        self.mean_i = np.zeros((p, p))
+        self.mean_j = np.zeros((p, p))
+        self.m2_i = np.zeros((p, p))
+        self.m2_j = np.zeros((p, p))
+        self.comoment = np.zeros((p, p))
+        self.min = np.full(p, np.inf)
+        self.max = np.full(p, -np.inf)
+        # Histograms need their edges up front, usually from the min and max of a first pass
+        self.bins = bins
+        self.histograms = None if bins is None else np.zeros((p, len(bins[0]) - 1))
+        self.bin_min = None if bins is None else np.full((p, len(bins[0]) - 1), np.inf)
+        self.bin_max = None if bins is None else np.full((p, len(bins[0]) - 1), -np.inf)
+
+    def update(self, data):
+        from pandas import DataFrame
+        if isinstance(data, DataFrame):
+            data = data[self.columns].to_numpy(dtype=float)
+        else:
+            data = np.asarray(data, dtype=float)
+        if len(data) == 0:
+            return self
+        valid = ~np.isnan(data)
+        with warnings.catch_warnings(), np.errstate(all='ignore'):
+            # Columns without values in this chunk only give NaNs, dropped below
+            warnings.simplefilter('ignore', RuntimeWarning)
+            self.min = np.fmin(self.min, np.nanmin(data, axis=0))
+            self.max = np.fmax(self.max, np.nanmax(data, axis=0))
+            shift = np.nan_to_num(np.nanmean(data, axis=0))
+
+            # Moments of the chunk around its own means, then merged with Chan's update of Welford's algorithm
+            n = valid.T.astype(float) @ valid
+            centered = np.where(valid, data - shift, 0)
+            mean_i = (centered.T @ valid) / n
+            mean_j = mean_i.T
+            m2_i = (centered**2).T @ valid - n * mean_i**2
+            m2_j = m2_i.T
+            comoment = centered.T @ centered - n * mean_i * mean_j
+            chunk = (n, mean_i + shift[:, None], mean_j + shift[None, :], m2_i, m2_j, comoment)
+            self.combine(*(np.nan_to_num(value) for value in chunk))
+
+        if self.histograms is not None:
+            for i, edges in enumerate(self.bins):
+                column = data[valid[:, i], i]
+                column = column[(column >= edges[0]) & (column <= edges[-1])]
+                b = np.minimum(np.searchsorted(edges, column, side='right') - 1, len(edges) - 2)
+                self.histograms[i] += np.bincount(b, minlength=len(edges) - 1)
+                np.minimum.at(self.bin_min[i], b, column)
+                np.maximum.at(self.bin_max[i], b, column)
+        return self
+
+    def merge(self, other):
+        self.min = np.fmin(self.min, other.min)
+        self.max = np.fmax(self.max, other.max)
+        self.combine(other.n, other.mean_i, other.mean_j, other.m2_i, other.m2_j, other.comoment)
+        if self.histograms is not None and other.histograms is not None:
+            self.histograms += other.histograms
+            self.bin_min = np.fmin(self.bin_min, other.bin_min)
+            self.bin_max = np.fmax(self.bin_max, other.bin_max)
+        return self
+
+    def combine(self, n, mean_i, mean_j, m2_i, m2_j, comoment):
+        total = self.n + n
+        with np.errstate(all='ignore'):
+            weight = np.nan_to_num(self.n * n / total)
+            ratio = np.nan_to_num(n / total)
+        delta_i = mean_i - self.mean_i
+        delta_j = mean_j - self.mean_j
+        self.m2_i += m2_i + delta_i**2 * weight
+        self.m2_j += m2_j + delta_j**2 * weight
+        self.comoment += comoment + delta_i * delta_j * weight
+        self.mean_i += delta_i * ratio
+        self.mean_j += delta_j * ratio
+        self.n = total
+
+    def count(self):
+        return np.diag(self.n)
+
+    def mean(self):
+        return np.where(self.count() > 0, np.diag(self.mean_i), np.nan)
+
+    def var(self, ddof=1):
+        with np.errstate(all='ignore'):
+            return np.where(self.count() > ddof, np.diag(self.m2_i) / (self.count() - ddof), np.nan)
+
+    def std(self, ddof=1):
+        return np.sqrt(self.var(ddof=ddof))
+
+    def corr(self, min_periods=1):
+        from pandas import DataFrame
+        with np.errstate(all='ignore'):
+            corr = self.comoment / np.sqrt(self.m2_i * self.m2_j)
+        corr = np.clip(corr, -1, 1)
+        corr[(self.n < max(min_periods, 2)) | (self.m2_i <= 0) | (self.m2_j <= 0)] = np.nan
+        return DataFrame(corr, index=self.columns, columns=self.columns)
+
+    def quantile(self, q):
+        # Interpolating like pandas between order statistics, these are spread evenly between
+        # the smallest and largest value of their bin, so exact for bins holding one distinct value
+        quantiles = np.full(len(self.columns), np.nan)
+        if self.histograms is None:
+            return quantiles
+        for i, counts in enumerate(self.histograms):
+            total = counts.sum()
+            if total == 0:
+                continue
+            cumulative = np.cumsum(counts)
+            rank = q * (total - 1)
+            low = self.orderStatistic(i, cumulative, int(np.floor(rank)))
+            high = self.orderStatistic(i, cumulative, int(np.ceil(rank)))
+            quantiles[i] = low + (rank - np.floor(rank)) * (high - low)
+        return quantiles
+
+    def orderStatistic(self, i, cumulative, k):
+        b = np.searchsorted(cumulative, k, side='right')
+        count = self.histograms[i][b]
+        position = k - (cumulative[b] - count)
+        fraction = position / (count - 1) if count > 1 else 0
+        return self.bin_min[i][b] + fraction * (self.bin_max[i][b] - self.bin_min[i][b])
+
+    def describe(self, percentiles=(0.25, 0.5, 0.75)):
+        from pandas import DataFrame
+        rows = [self.count(), self.mean(), self.std(), self.min]
+        rows += [self.quantile(q) for q in percentiles]
+        rows.append(self.max)
+        index = ['count', 'mean', 'std', 'min'] + ['%g%%' % (100 * q) for q in percentiles] + ['max']
+        return DataFrame(rows, index=index, columns=self.columns)
+
+def getHistogramBins(statistics, n_bins=1024):
+    # Equal width bins between the observed min and max of every column
+    bins = []
+    for low, high in zip(statistics.min, statistics.max):
+        if not np.isfinite(low):
+            low, high = 0, 1
+        elif low == high:
+            low, high = low - 0.5, high + 0.5
+        bins.append(np.linspace(low, high, n_bins + 1))
+    return bins
+
+def summarizeResults(name, folder='', columns=Report.index[1:], bins=None, chunksize=1 << 16):
+    statistics = StreamingStatistics(columns, bins=bins)
+    for chunk in Results.iterateResults(name, folder=folder, chunksize=chunksize):
+        statistics.update(chunk)
+    return statistics
+
+def summarizeFolder(folder='', columns=Report.index[1:], n_bins=1024, workers=None, chunksize=1 << 16):
+    # Two passes over the results, one per file and process: moments and ranges, then histograms within those ranges
+    names = Results.getResultNames(folder)
+    if workers is None:
+        workers = cpu_count()
+    statistics = StreamingStatistics(columns)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        n = len(names)
+        for result in executor.map(summarizeResults, names, [folder]*n, [columns]*n, [None]*n, [chunksize]*n):
+            statistics.merge(result)
+        bins = getHistogramBins(statistics, n_bins=n_bins)
+        histograms = StreamingStatistics(columns, bins=bins)
+        for result in executor.map(summarizeResults, names, [folder]*n, [columns]*n, [bins]*n, [chunksize]*n):
+            histograms.merge(result)
+    return histograms
@@ -0,0 +1,122 @@
+import networkx as nx
+import numpy as np
+import src.Demand as Demand
+import src.PathPlan as PathPlan
+
+# Single link failures: the connections crossing the failed link are torn down and rerouted in their
+# original order over the surviving k shortest paths (or the shortest path avoiding the link when none survive),
+# every other connection keeps its spectrum.
+# Demands blocked before the failure stay blocked.
+
+def getConnections(eon, demands):
+    # Admitted demands in admission order as (source, target, data rate, links index, spectrum begin,
+    # frequency slots, modulation data rate), with the number of demands and of blocked ones
+    connections = []
+    if isinstance(demands, Demand.DemandSet):
+        nodes = demands.nodes
+        for i in np.flatnonzero(demands.status == Demand.SUCCESS).tolist():
+            source, target = nodes[demands.source[i]], nodes[demands.target[i]]
+            plan = eon.path_plans[source][target][demands.k[i]]
+            connections.append((source, target, demands.data_rate[i].item(), plan.links_index.tolist(),
+                                int(demands.spectrum_begin[i]), int(demands.frequency_slots[i]), plan.modulation_level.data_rate))
+        n_demands = len(demands)
+    else:
+        n_demands = 0
+        for demand in demands:
+            n_demands += 1
+            if demand.status is True:
+                connections.append((demand.source, demand.target, demand.data_rate, list(demand.links_index),
+                                    demand.spectrum_begin, demand.frequency_slots, demand.modulation_level.data_rate))
+    return connections, n_demands, n_demands - len(connections)
+
+def allocateConnections(eon, connections):
+    # Spectrum as the simulation left it, batch simulations may not have written it back
+    eon.resetSpectrum()
+    for _, _, _, links_index, spectrum_begin, frequency_slots, value in connections:
+        eon.allocateSpectrum(links_index, spectrum_begin, frequency_slots, value)
+
+def getCrossingConnections(connections):
+    # Connections crossing each spectrum row, in admission order
+    crossing = {}
+    for c, connection in enumerate(connections):
+        for index in connection[3]:
+            crossing.setdefault(index, []).append(c)
+    return crossing
+
+def getBackupPlans(eon, source, target, failed_link):
+    # Shortest path avoiding the failed link, for pairs whose k paths all crossed it,
+    # a single Dijkstra instead of k shortest paths for every such pair and failure
+    def weight(u, v, data):
+        return None if {u, v} == set(failed_link) else data['length']
+    try:
+        length, path = nx.bidirectional_dijkstra(eon, source, target, weight=weight)
+    except nx.exception.NetworkXNoPath:
+        return []
+    return [PathPlan.createPathPlan(eon, path, length, eon.sorted_modulation_levels, eon.plan_data_rates)]
+
+def evaluateFailure(eon, connections, crossing, failed_link, n_demands, n_blocks, recompute_routes=True):
+    index = eon.link_index[failed_link]
+    affected = crossing.get(index, [])
+    for c in affected:
+        _, _, _, links_index, spectrum_begin, frequency_slots, _ = connections[c]
+        eon.releaseSpectrum(links_index, spectrum_begin, frequency_slots)
+
+    restored = 0
+    lost_data_rate = 0
+    rerouted = []
+    backup_plans = {}
+    for c in affected:
+        source, target, data_rate = connections[c][:3]
+        plans = [plan for plan in eon.path_plans[source][target][:eon.k_paths] if index not in plan.links_index]
+        if not plans and recompute_routes:
+            if (source, target) not in backup_plans:
+                backup_plans[source, target] = getBackupPlans(eon, source, target, failed_link)
+            plans = backup_plans[source, target]
+        for plan in plans:
+            if plan.modulation_level is None:
+                continue
+            frequency_slots = plan.getFrequencySlots(data_rate)
+            spectrum_begin = eon.assignSpectrum(plan.links_index, frequency_slots)
+            if spectrum_begin is not None:
+                eon.allocateSpectrum(plan.links_index, spectrum_begin, frequency_slots, plan.modulation_level.data_rate)
+                rerouted.append((plan.links_index, spectrum_begin, frequency_slots))
+                restored += 1
+                break
+        else:
+            lost_data_rate += data_rate
+
+    # Putting the spectrum back as it was before the failure
+    for links_index, spectrum_begin, frequency_slots in rerouted:
+        eon.releaseSpectrum(links_index, spectrum_begin, frequency_slots)
+    for c in affected:
+        _, _, _, links_index, spectrum_begin, frequency_slots, value = connections[c]
+        eon.allocateSpectrum(links_index, spectrum_begin, frequency_slots, value)
+
+    blocks = n_blocks + len(affected) - restored
+    return {
+        'affected': len(affected),
+        'restored': restored,
+        'lost_data_rate': lost_data_rate,
+        'blocks': blocks,
+        'blocking_coefficient': blocks / n_demands if n_demands > 0 else None,
+    }
+
+def evaluateFailures(eon, demands, links=None, recompute_routes=True):
+    # Results of every single link failure (or of the given links) of a simulated topology
+    if links is None:
+        links = list(eon.edges())
+    connections, n_demands, n_blocks = getConnections(eon, demands)
+    allocateConnections(eon, connections)
+    crossing = getCrossingConnections(connections)
+    return {link: evaluateFailure(eon, connections, crossing, link, n_demands, n_blocks, recompute_routes) for link in links}
+
+def summarize(failures):
+    # Mean and worst blocking over the failures, and the share of torn down connections restored
+    blocking = [failure['blocking_coefficient'] for failure in failures.values() if failure['blocking_coefficient'] is not None]
+    affected = sum(failure['affected'] for failure in failures.values())
+    restored = sum(failure['restored'] for failure in failures.values())
+    return {
+        'mean_failure_blocking': sum(blocking) / len(blocking) if blocking else None,
+        'worst_failure_blocking': max(blocking) if blocking else None,
+        'restorability': restored / affected if affected > 0 else 1.0,
+    }
@@ -0,0 +1,119 @@
+import numpy as np
+from hashlib import sha256
+import json
+import os
+import shutil
+
+# Bumped whenever the layout below changes, so old caches are not read
+version = 1
+
+# Arrays of a cached topology, one .npy file each so they can be memory mapped:
+# nodes by position, links by node positions with their spectrum row, and the
+# k shortest paths of every pair (i, j) with i < j in node order, as node positions
+arrays = ['node_id', 'node_lat', 'node_lon', 'node_type', 'link_source', 'link_target', 'link_length', 'link_index',
+          'route_count', 'path_offset', 'path_node', 'path_length']
+
+def getCacheKey(nodes_csv, links_csv, k_paths, frequency_slots):
+    # Content of the CSVs and the parameters routes depend on
+    key = sha256(('%d:%d:%d' % (version, k_paths, frequency_slots)).encode())
+    for filename in (nodes_csv, links_csv):
+        key.update(b'\0')
+        if filename is not None:
+            with open(filename, 'rb') as file:
+                for block in iter(lambda: file.read(1 << 20), b''):
+                    key.update(block)
+    return key.hexdigest()
+
+def getCachePath(eon, nodes_csv, links_csv, folder):
+    return os.path.join(folder, getCacheKey(nodes_csv, links_csv, eon.k_paths, eon.frequency_slots))
+
+def saveTopology(eon, path):
+    nodes = list(eon.nodes())
+    position = {node: i for i, node in enumerate(nodes)}
+    data = {
+        'node_id': np.asarray(nodes),
+        'node_lat': np.array([eon.nodes[node].get('lat', np.nan) for node in nodes], dtype=float),
+        'node_lon': np.array([eon.nodes[node].get('lon', np.nan) for node in nodes], dtype=float),
+        'node_type': np.array([str(eon.nodes[node].get('type', '')) for node in nodes]),
+    }
+    links = list(eon.edges(data=True))
+    data['link_source'] = np.array([position[source] for source, _, _ in links], dtype=np.int32)
+    data['link_target'] = np.array([position[target] for _, target, _ in links], dtype=np.int32)
+    data['link_length'] = np.asarray([attributes['length'] for _, _, attributes in links])
+    data['link_index'] = np.array([attributes['index'] for _, _, attributes in links], dtype=np.intp)
+
+    route_count = []
+    path_offset = [0]
+    path_node = []
+    path_length = []
+    for i, source in enumerate(nodes):
+        for target in nodes[i+1:]:
+            paths = eon.shortest_path[source][target]
+            route_count.append(len(paths))
+            for nodes_path in paths:
+                path_node += [position[node] for node in nodes_path]
+                path_offset.append(len(path_node))
+            path_length += eon.shortest_path_length[source][target]
+    data['route_count'] = np.array(route_count, dtype=np.int32)
+    data['path_offset'] = np.array(path_offset, dtype=np.int64)
+    data['path_node'] = np.array(path_node, dtype=np.int32)
+    data['path_length'] = np.asarray(path_length) if path_length else data['link_length'][:0]
+
+    # Node ids mixing types would need pickles, those topologies are simply not cached
+    if any(array.dtype == object for array in data.values()):
+        return False
+    # Writing next to the cache and renaming, so readers never see half a cache
+    temporary = '%s.%d.tmp' % (path, os.getpid())
+    os.makedirs(temporary, exist_ok=True)
+    for name in arrays:
+        np.save(os.path.join(temporary, name + '.npy'), data[name], allow_pickle=False)
+    with open(os.path.join(temporary, 'topology.json'), 'w') as file:
+        json.dump({'version': version, 'k_paths': eon.k_paths, 'frequency_slots': eon.frequency_slots}, file)
+    try:
+        os.rename(temporary, path)
+    except OSError:
+        # Another process cached the same topology first
+        shutil.rmtree(temporary, ignore_errors=True)
+    return True
+
+def loadTopology(eon, path):
+    # Filling an empty EON from the cache, False when there is no usable cache
+    try:
+        with open(os.path.join(path, 'topology.json'), 'r') as file:
+            metadata = json.load(file)
+    except FileNotFoundError:
+        return False
+    if metadata['version'] != version or metadata['k_paths'] != eon.k_paths or metadata['frequency_slots'] != eon.frequency_slots:
+        return False
+    data = {name: np.load(os.path.join(path, name + '.npy'), mmap_mode='r') for name in arrays}
+
+    nodes = data['node_id'].tolist()
+    lats = data['node_lat'].tolist()
+    lons = data['node_lon'].tolist()
+    types = data['node_type'].tolist()
+    eon.addNodes(nodes, lats, lons, types)
+    eon.addLinks([nodes[i] for i in data['link_source'].tolist()], [nodes[i] for i in data['link_target'].tolist()],
+                 data['link_length'].tolist(), data['link_index'].tolist())
+
+    route_count = data['route_count'].tolist()
+    path_offset = data['path_offset'].tolist()
+    path_node = data['path_node'].tolist()
+    path_length = data['path_length'].tolist()
+    eon.shortest_path = {node: {} for node in nodes}
+    eon.shortest_path_length = {node: {} for node in nodes}
+    pair = 0
+    first = 0
+    for i, source in enumerate(nodes):
+        eon.shortest_path[source][source] = [[source]]
+        eon.shortest_path_length[source][source] = [0]
+        for target in nodes[i+1:]:
+            count = route_count[pair]
+            paths = [[nodes[node] for node in path_node[path_offset[p]:path_offset[p+1]]] for p in range(first, first + count)]
+            lengths = path_length[first:first + count]
+            eon.shortest_path[source][target] = paths
+            eon.shortest_path_length[source][target] = lengths
+            eon.shortest_path[target][source] = [path[::-1] for path in paths]
+            eon.shortest_path_length[target][source] = list(lengths)
+            pair += 1
+            first += count
+    return True
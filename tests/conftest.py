@@ -0,0 +1,37 @@
+import sys
+import os
+import pytest
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root)
+
+from src.EON import EON
+import src.ModulationLevel as ModulationLevel
+
+nodes_csv = os.path.join(root, 'input/rnp/rnpBrazil_nodes.csv')
+links_csv = os.path.join(root, 'input/rnp/rnpBrazil_links.csv')
+
+def loadRNP(links=True):
+    eon = EON(name='RNP')
+    eon.loadCSV(nodes_csv, links_csv if links else None)
+    return eon
+
+def rebuild(eon):
+    # Same nodes and links as eon, with routes built from scratch
+    rebuilt = loadRNP(links=False)
+    links = list(eon.edges(data='length'))
+    rebuilt.addLinks([link[0] for link in links], [link[1] for link in links], [link[2] for link in links])
+    rebuilt.initializeRoutes()
+    return rebuilt
+
+@pytest.fixture
+def rnp():
+    return loadRNP()
+
+@pytest.fixture
+def rnp_nodes():
+    return loadRNP(links=False)
+
+@pytest.fixture(scope='session')
+def modulation_levels():
+    return ModulationLevel.loadModulationLevels(os.path.join(root, 'input/modulation_levels.csv'))
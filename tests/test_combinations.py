@@ -0,0 +1,40 @@
+from itertools import combinations, islice
+import networkx as nx
+import src.Combinations as Combinations
+
+def test_unrank_matches_itertools():
+    items = list(range(9))
+    for n_choose in (1, 3, 5):
+        for index, combination in enumerate(combinations(items, n_choose)):
+            assert Combinations.unrankCombination(items, n_choose, index) == combination
+            assert Combinations.rankCombination(items, combination) == index
+
+def test_iterate_slices_match_itertools(rnp):
+    links = Combinations.getCandidateLinks(rnp)
+    expected = list(combinations(links, 3))
+    for start, stop, step in ((0, None, 1), (100, 2500, 1), (7, 5000, 13), (len(expected) - 5, None, 2)):
+        assert list(Combinations.getPossibleNewLinks(rnp, n_links=3, start=start, stop=stop, step=step)) == list(islice(expected, start, stop, step))
+
+def getBruteForceCandidates(eon, n_links, k_edge_connected):
+    # Indices of the candidates whose topology is k-edge-connected, checking every one of them
+    accepted = []
+    for index, links in enumerate(combinations(Combinations.getCandidateLinks(eon), n_links)):
+        graph = nx.Graph(eon.edges())
+        graph.add_nodes_from(eon.nodes())
+        graph.add_edges_from(link[:2] for link in links)
+        if nx.is_k_edge_connected(graph, k_edge_connected):
+            accepted.append(index)
+    return accepted
+
+def test_candidate_filter_matches_brute_force(rnp):
+    # Without some links RNP has nodes of degree one and bridges, so the filter has something to reject
+    for source, target in list(rnp.edges())[:2]:
+        rnp.removeLink(source, target)
+    links = Combinations.getCandidateLinks(rnp)
+    for k_edge_connected in (1, 2):
+        expected = getBruteForceCandidates(rnp, 3, k_edge_connected)
+        candidate_filter = Combinations.CandidateFilter(rnp, links, k_edge_connected)
+        found = list(candidate_filter.iterate(3))
+        assert [index for index, _ in found] == expected
+        assert all(Combinations.unrankCombination(links, 3, index) == candidate for index, candidate in found)
+        assert [index for index, _ in candidate_filter.iterate(3, start=3000, stop=9000)] == [index for index in expected if 3000 <= index < 9000]
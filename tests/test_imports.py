@@ -0,0 +1,43 @@
+from statistics import median
+import subprocess
+import json
+import sys
+import os
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules no star import of EONTools may load, scripts needing them import them by name
+forbidden = ['pandas', 'matplotlib', 'seaborn', 'scipy', 'asyncio',
+             'src.Service', 'src.Parallel', 'src.Search', 'src.Statistics', 'src.Dynamic', 'src.LoadSweep']
+
+# Seconds an import may take in a fresh interpreter, median of a few, as check_imports.py allows
+budget = 1.0
+
+def run(statement, expression):
+    # Checking in a fresh interpreter, this one may have imported anything already
+    probe = '%s\nimport sys, json\nprint(json.dumps(%s))' % (statement, expression)
+    output = subprocess.run([sys.executable, '-c', probe], cwd=root, capture_output=True, text=True, check=True)
+    return json.loads(output.stdout)
+
+def getLoadedModules(statement):
+    return run(statement, '[name for name in %r if name in sys.modules]' % forbidden)
+
+def test_star_import_loads_only_the_core():
+    assert getLoadedModules('from EONTools import *') == []
+
+def test_star_import_names():
+    names = run('namespace = {}\nexec("from EONTools import *", namespace)', 'sorted(name for name in namespace if name != "__builtins__")')
+    assert names == sorted(['EON', 'Report', 'ModulationLevel', 'Combinations', 'Demand', 'Simulation'])
+
+def test_other_modules_load_on_use():
+    assert getLoadedModules('import EONTools\nEONTools.Service') == ['asyncio', 'src.Service']
+
+def getImportTime(statement, repeat=3):
+    timed = 'import time\nstart = time.perf_counter()\n%s\nelapsed = time.perf_counter() - start' % statement
+    return median(run(timed, 'elapsed') for _ in range(repeat))
+
+def test_simulation_core_import_time():
+    assert getImportTime('import src.EON, src.Simulation, src.Demand, src.Combinations') < budget
+
+def test_star_import_time():
+    assert getImportTime('from EONTools import *') < budget
@@ -0,0 +1,62 @@
+import pytest
+import src.Demand as Demand
+import src.Parallel as Parallel
+import src.Results as Results
+import src.Report as Report
+
+# A slice of the RNP candidates with ten links holding a hundred or so connected ones
+start, stop = 126150000, 126200000
+
+def simulate(eon, modulation_levels, folder, csv_name, start, stop):
+    demands = Demand.createRandomDemands(eon, random_state=0)
+    Parallel.simulate(eon, modulation_levels, demands, [10], csv_name, folder=folder, k_edge_connected=2,
+                      start=start, stop=stop, workers=1)
+
+def getRows(folder, csv_name):
+    with open(folder + csv_name + '.csv') as file:
+        return file.read().splitlines()
+
+def test_resumed_runs_match_a_single_run(rnp_nodes, modulation_levels, tmp_path):
+    folder = str(tmp_path) + '/'
+    simulate(rnp_nodes, modulation_levels, folder, 'single', start, stop)
+    # Overlapping runs with other starts and stops, the last one covering ids already written
+    for run_start, run_stop in ((start + 12000, start + 25000), (start, start + 20000), (start, stop), (start, stop)):
+        simulate(rnp_nodes, modulation_levels, folder, 'resumed', run_start, run_stop)
+    expected = getRows(folder, 'single')
+    rows = getRows(folder, 'resumed')
+    assert len(expected) > 50
+    assert len(rows) == len(expected) and sorted(rows) == sorted(expected)
+    assert Results.loadCheckpoint('resumed', folder=folder)['ranges'] == [[start, stop - 1]]
+
+def test_rows_after_the_checkpoint_are_dropped(tmp_path):
+    folder = str(tmp_path) + '/'
+    row = dict.fromkeys(Report.index, 0)
+    with Results.ResultsWriter('results', folder=folder) as writer:
+        writer.writeRows([dict(row, **{'': 3}), dict(row, **{'': 7})], completed=(0, 9))
+    size = len(open(folder + 'results.csv').read())
+    # Rows of a run that stopped before its checkpoint
+    with open(folder + 'results.csv', 'a') as file:
+        file.write('12,0,0,0,0,0,0,0,0,0,0,0\n')
+    with Results.ResultsWriter('results', folder=folder) as writer:
+        assert len(open(folder + 'results.csv').read()) == size
+        assert writer.getMissingRanges(0, 30) == [(10, 30)]
+        writer.writeRows([dict(row, **{'': 20})], completed=(20, 29))
+        assert writer.getMissingRanges(0, 30) == [(10, 30)]
+    with Results.ResultsWriter('results', folder=folder) as writer:
+        assert writer.getMissingRanges(0, 40) == [(10, 20), (30, 40)]
+    assert [line.split(',')[0] for line in getRows(folder, 'results')] == ['', '3', '7', '20']
+
+def test_results_that_cannot_be_resumed(tmp_path):
+    folder = str(tmp_path) + '/'
+    Results.ResultsWriter('results', folder=folder).close()
+    with pytest.raises(ValueError):
+        Results.ResultsWriter('results', folder=folder, fieldnames=Report.index + Report.survivability_index)
+    # Rows numbered before checkpoints existed are refused, a header alone is not
+    with open(folder + 'legacy.csv', 'w') as file:
+        file.write(','.join(Report.index) + '\n0,2,0,0,0,0,0,0,0,0,0,0\n')
+    with pytest.raises(ValueError):
+        Results.ResultsWriter('legacy', folder=folder)
+    with open(folder + 'header.csv', 'w') as file:
+        file.write(','.join(Report.index) + '\n')
+    Results.ResultsWriter('header', folder=folder).close()
+    assert not (tmp_path / 'legacy.lock').exists()
@@ -0,0 +1,50 @@
+import numpy as np
+import src.Combinations as Combinations
+from conftest import rebuild
+
+def assertSameRoutes(eon, expected):
+    for source in eon.nodes():
+        for target in eon.nodes():
+            assert eon.shortest_path[source][target] == expected.shortest_path[source][target]
+            assert np.allclose(eon.shortest_path_length[source][target], expected.shortest_path_length[source][target])
+
+def test_add_links_updates_routes(rnp):
+    rnp.initializeRoutes()
+    candidates = Combinations.getCandidateLinks(rnp)
+    generator = np.random.RandomState(0)
+    for i in generator.choice(len(candidates), 4, replace=False):
+        rnp.addLink(*candidates[i])
+        assertSameRoutes(rnp, rebuild(rnp))
+
+def test_add_links_at_once_updates_routes(rnp):
+    rnp.initializeRoutes()
+    candidates = Combinations.getCandidateLinks(rnp)
+    links = [candidates[i] for i in np.random.RandomState(1).choice(len(candidates), 3, replace=False)]
+    for link in links:
+        rnp.addLink(*link, update_routes=False)
+    rnp.updateRoutes([link[:2] for link in links])
+    assertSameRoutes(rnp, rebuild(rnp))
+
+def test_remove_links_updates_routes(rnp):
+    rnp.initializeRoutes()
+    for source, target in list(rnp.edges())[:4]:
+        rnp.removeLink(source, target)
+        assertSameRoutes(rnp, rebuild(rnp))
+
+def test_candidate_routes_and_plans(rnp, modulation_levels):
+    # Candidates only update the routes of the base they share
+    rnp.compilePathPlans(modulation_levels)
+    candidates = Combinations.getCandidateLinks(rnp)
+    generator = np.random.RandomState(2)
+    for n_links in (1, 2, 3):
+        links = [candidates[i] for i in generator.choice(len(candidates), n_links, replace=False)]
+        candidate = Combinations.createPossibleEON(rnp, links)
+        expected = rebuild(candidate)
+        assertSameRoutes(candidate, expected)
+        expected.compilePathPlans(modulation_levels)
+        for source in candidate.nodes():
+            for target in candidate.nodes():
+                plans = candidate.path_plans[source][target]
+                expected_plans = expected.path_plans[source][target]
+                assert [plan.links_path for plan in plans] == [plan.links_path for plan in expected_plans]
+                assert [plan.modulation_level for plan in plans] == [plan.modulation_level for plan in expected_plans]
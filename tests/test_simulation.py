@@ -0,0 +1,80 @@
+import numpy as np
+import src.Demand as Demand
+import src.Simulation as Simulation
+import src.Combinations as Combinations
+from math import ceil
+from conftest import loadRNP
+
+def createDemandSet(eon, rounds=8):
+    # Repeating the demands until some of them are blocked
+    return Demand.concatenateDemandSets([Demand.createRandomDemandSet(eon, random_state=0)]*rounds)
+
+def simulateNaively(eon, modulation_levels, demand_set):
+    # Routes from the route table, the fastest modulation level reaching each path and first fit
+    # scanning every slot of the spectrum matrix, as (k, spectrum begin, frequency slots) per demand
+    eon.initializeRoutes()
+    occupancy = np.zeros((len(eon.spectrum), eon.frequency_slots), dtype=bool)
+    results = []
+    for source, target, data_rate in zip(demand_set.source, demand_set.target, demand_set.data_rate):
+        source, target = demand_set.nodes[source], demand_set.nodes[target]
+        result = (-1, -1, 0)
+        paths = zip(eon.shortest_path[source][target], eon.shortest_path_length[source][target])
+        for k, (path, length) in enumerate(list(paths)[:eon.k_paths]):
+            levels = [ml for ml in modulation_levels if length <= ml.reach]
+            if not levels:
+                continue
+            slots = ceil(data_rate / max(levels, key=lambda ml: ml.data_rate).data_rate)
+            rows = [eon.link_index[path[h], path[h+1]] for h in range(len(path)-1)]
+            free = ~occupancy[rows].any(axis=0)
+            begins = [begin for begin in range(eon.frequency_slots - slots + 1) if free[begin:begin+slots].all()]
+            if begins:
+                occupancy[rows, begins[0]:begins[0]+slots] = True
+                result = (k, begins[0], slots)
+                break
+        results.append(result)
+    return results
+
+def getResults(demand_set):
+    return list(zip(demand_set.k.tolist(), demand_set.spectrum_begin.tolist(), demand_set.frequency_slots.tolist()))
+
+def test_demand_set_matches_naive_simulation(modulation_levels):
+    eon = loadRNP()
+    demand_set = createDemandSet(eon)
+    Simulation.simulateDemandSet(eon, modulation_levels, demand_set)
+    expected = simulateNaively(loadRNP(), modulation_levels, demand_set)
+    assert getResults(demand_set) == expected
+    assert (demand_set.status == Demand.BLOCKED).any()
+    assert ((demand_set.status == Demand.SUCCESS) == (demand_set.k >= 0)).all()
+
+def test_demand_set_matches_demand_objects(modulation_levels):
+    for policy in ('first_fit', 'last_fit', 'best_fit', 'exact_fit', 'random_fit'):
+        eon = loadRNP()
+        eon.setSpectrumPolicy(policy, random_state=0)
+        demand_set = createDemandSet(eon)
+        Simulation.simulateDemandSet(eon, modulation_levels, demand_set)
+        other = loadRNP()
+        other.setSpectrumPolicy(policy, random_state=0)
+        demands = createDemandSet(other).toDemands()
+        Simulation.simulateDemands(other, modulation_levels, demands)
+        for demand, expected in zip(demand_set.toDemands(eon, modulation_levels), demands):
+            assert demand.status == expected.status
+            if demand.status:
+                assert (demand.links_path, demand.spectrum_begin, demand.frequency_slots) == (expected.links_path, expected.spectrum_begin, expected.frequency_slots)
+                assert demand.modulation_level is expected.modulation_level
+        assert (eon.spectrum == other.spectrum).all()
+
+def test_batch_matches_one_candidate_at_a_time(modulation_levels):
+    base = loadRNP()
+    base.compilePathPlans(modulation_levels)
+    candidates = Combinations.getCandidateLinks(base)
+    generator = np.random.RandomState(0)
+    links = [[candidates[i] for i in generator.choice(len(candidates), n_links, replace=False)] for n_links in (0, 1, 2, 3, 3, 5)]
+    demand_set = createDemandSet(base)
+    eons = [Combinations.createPossibleEON(base, candidate_links) for candidate_links in links]
+    results = Simulation.simulateBatch(eons, modulation_levels, demand_set)
+    for candidate_links, eon, result in zip(links, eons, results):
+        expected = Combinations.createPossibleEON(base, candidate_links)
+        Simulation.simulateDemandSet(expected, modulation_levels, demand_set)
+        assert getResults(result) == getResults(demand_set)
+        assert (result.status == demand_set.status).all() and (result.modulation_level == demand_set.modulation_level).all()
+        assert (eon.spectrum == expected.spectrum).all()
@@ -0,0 +1,63 @@
+import numpy as np
+import src.Spectrum as Spectrum
+
+def getFreeRuns(spectrum, links_index):
+    # Maximal runs of slots free on every link, scanning the matrix
+    free = ~spectrum[links_index].astype(bool).any(axis=0)
+    runs = []
+    begin = None
+    for slot, is_free in enumerate(list(free) + [False]):
+        if is_free and begin is None:
+            begin = slot
+        elif not is_free and begin is not None:
+            runs.append((begin, slot))
+            begin = None
+    return runs
+
+def fitNaively(policy, spectrum, links_index, frequency_slots, random):
+    runs = [(begin, end) for begin, end in getFreeRuns(spectrum, links_index) if end - begin >= frequency_slots]
+    begins = [slot for begin, end in runs for slot in range(begin, end - frequency_slots + 1)]
+    if not begins:
+        return None
+    if policy == 'first_fit':
+        return begins[0]
+    if policy == 'last_fit':
+        return begins[-1]
+    if policy == 'best_fit':
+        return min(runs, key=lambda run: run[1] - run[0])[0]
+    if policy == 'exact_fit':
+        return next((begin for begin, end in runs if end - begin == frequency_slots), begins[0])
+    return begins[int(random.random() * len(begins))]
+
+def test_policies_match_naive_fits(rnp, modulation_levels):
+    # Connections over RNP paths come and go, every policy is checked on each new one
+    rnp.compilePathPlans(modulation_levels)
+    plans = [plan for source in rnp.path_plans for target in rnp.path_plans[source]
+             for plan in rnp.path_plans[source][target] if len(plan.links_index) > 0]
+    generator = np.random.RandomState(0)
+    connections = []
+    for step in range(1500):
+        if connections and generator.random_sample() < 0.3:
+            rnp.releaseSpectrum(*connections.pop(generator.randint(len(connections))))
+        plan = plans[generator.randint(len(plans))]
+        frequency_slots = int(generator.randint(1, 40))
+        for policy, fit in Spectrum.policies.items():
+            begin = fit(rnp.getFreeIntervals(), plan.links_index, frequency_slots, np.random.RandomState(step))
+            assert begin == fitNaively(policy, rnp.spectrum, plan.links_index, frequency_slots, np.random.RandomState(step))
+        begin = rnp.assignSpectrum(plan.links_index, frequency_slots)
+        if begin is not None:
+            rnp.allocateSpectrum(plan.links_index, begin, frequency_slots, 1)
+            connections.append((plan.links_index, begin, frequency_slots))
+    assert len(connections) > 50
+
+def test_free_intervals_follow_the_matrix(rnp):
+    # Intervals kept in step with allocations and releases, overlapping ones included, match a rebuild
+    free_intervals = rnp.getFreeIntervals()
+    generator = np.random.RandomState(1)
+    for _ in range(2000):
+        links_index = generator.choice(len(rnp.spectrum), generator.randint(1, 4), replace=False)
+        frequency_slots = int(generator.randint(1, 30))
+        begin = int(generator.randint(rnp.frequency_slots - frequency_slots + 1))
+        rnp.allocateSpectrum(links_index, begin, frequency_slots, generator.randint(2))
+        expected = Spectrum.FreeIntervals(rnp.spectrum)
+        assert free_intervals.begins == expected.begins and free_intervals.ends == expected.ends